@@ -1,9 +1,19 @@
 """The trading journal application package."""
 
-from importlib.metadata import version as _version
+import time
 
+STARTED_AT = time.perf_counter()
+"""Time at which the application was imported, as a performance counter."""
 APP_NAME = "trading-journal"
 """Application name."""
 
-__version__ = _version(APP_NAME)
-"""Application version."""
+
+def __getattr__(name: str) -> str:
+    if name != "__version__":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # resolved on first use, reading the package metadata is slow
+    from importlib.metadata import version
+
+    globals()["__version__"] = version(APP_NAME)
+    return globals()["__version__"]
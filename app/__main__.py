@@ -1,5 +1,5 @@
 """Main entry point for the trading journal package."""
 
-from .main import app
+from .client import main
 
-app(prog_name=app.info.name)
+main()
@@ -0,0 +1,122 @@
+"""Thin command-line client of the application daemon. Only the standard
+library is imported, so that forwarded commands start quickly."""
+
+__all__ = ["main", "forward", "socket_path"]
+
+import getpass
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+from app import APP_NAME
+
+LOCAL_COMMANDS = {
+    ("serve",),
+    ("clean",),
+    ("journal", "stream"),
+    ("journal", "watch"),
+}
+"""Commands that are never forwarded to the daemon, as they are
+interactive or long-running."""
+LOCAL_OPTIONS = {
+    (): {"--env"},
+    ("logs",): {"--follow", "-f"},
+    ("journal", "logs"): {"--follow", "-f"},
+    ("journal", "config"): {"--edit", "-e"},
+}
+"""Options of commands that are run locally when set, as they are
+interactive, long-running or need their own environment."""
+GROUPS = {(), ("logs",), ("journal",), ("journal", "logs")}
+"""Command groups, whose subcommands are resolved from the arguments."""
+VALUE_OPTIONS = {
+    "--env",
+    "--profile-dump",
+    "--run",
+    "-r",
+    "--since",
+    "--level",
+    "--logger",
+}
+"""Options of command groups which take a value."""
+
+
+def main() -> None:
+    """Run a command, through the daemon if it is running."""
+    if (code := forward(sys.argv[1:])) is not None:
+        sys.exit(code)
+
+    from app.main import app  # only imported when running locally
+
+    app(prog_name=APP_NAME)
+
+
+def forward(argv: list[str], path: Path | None = None) -> int | None:
+    """Run a command through the daemon, streaming its output. Returns the
+    exit code, or `None` if the command must be run locally."""
+    if not hasattr(socket, "AF_UNIX") or is_local(argv):
+        return None
+
+    path = path or socket_path()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        if os.stat(path).st_uid != os.getuid():
+            client.close()
+            print(f"Ignoring daemon of another user: {path}", file=sys.stderr)
+            return None
+        client.connect(str(path))
+    except OSError:  # not running
+        client.close()
+        return None
+
+    with client, client.makefile("rwb") as stream:
+        request = {"argv": argv, "terminal": sys.stdout.isatty()}
+        stream.write(json.dumps(request).encode() + b"\n")
+        stream.flush()
+
+        for line in stream:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            if "restart" in message:  # settings changed, run locally
+                return None
+            output = getattr(sys, message["stream"])
+            output.write(message["data"])
+            output.flush()
+
+    print("Daemon connection closed unexpectedly.", file=sys.stderr)
+    return 1
+
+
+def is_local(argv: list[str]) -> bool:
+    """Whether a command must be run locally. The command is resolved from
+    the arguments, so that values are not mistaken for commands."""
+    path: tuple[str, ...] = ()
+    args = iter(argv)
+    for arg in args:
+        if arg == "--":
+            break
+        if arg.startswith("-"):
+            option = arg.split("=", 1)[0]
+            if option in LOCAL_OPTIONS.get(path, set()):
+                return True
+            if path in GROUPS and option in VALUE_OPTIONS and "=" not in arg:
+                next(args, None)  # the option's value
+            continue
+        if path not in GROUPS:
+            continue  # an argument of the command
+        path = (*path, arg)
+        if path in LOCAL_COMMANDS:
+            return True
+    return False
+
+
+def socket_path() -> Path:
+    """The daemon's socket, in a directory private to the current user. The
+    temporary directory is shared, so a user directory is created in it."""
+    name = f"{APP_NAME}-{getpass.getuser()}"
+    if directory := os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(directory) / f"{name}.sock"
+    return Path(tempfile.gettempdir()) / name / f"{APP_NAME}.sock"
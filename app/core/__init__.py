@@ -2,4 +2,7 @@
 
 from .hosting import *
 from .logging import *
+from .profiling import *
 from .settings import *
+
+# timeseries is imported directly, as it loads numpy
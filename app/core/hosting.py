@@ -1,15 +1,24 @@
 """Application host configuration."""
 
-__all__ = ["Host"]
+__all__ = ["Host", "Services", "Lifetime"]
 
+import asyncio
+import inspect
+import sys
+import threading
+import time
+import weakref
 from abc import ABC
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, ClassVar
+from typing import Annotated, Any, Awaitable, Callable, ClassVar
 
 import typer
 from blinker import Signal, signal
 
-from . import __name__, logging, settings
+from . import __name__, logging, profiling, settings
 
 
 class LifecycleEvents(str, Enum):
@@ -21,23 +30,157 @@ class LifecycleEvents(str, Enum):
     """Application shutdown event."""
 
 
-class Services(dict[type, Any | Callable[[], Any]]):
+class Lifetime(str, Enum):
+    """Lifetime of a registered service."""
+
+    SINGLETON = "singleton"
+    """Created once, and shared across commands until hosts are stopped
+    without being served by a daemon."""
+    SCOPED = "scoped"
+    """Created once per command, and disposed when its host stops."""
+    TRANSIENT = "transient"
+    """Created on every lookup, and owned by the caller."""
+
+
+@dataclass
+class Registration:
+    """Registration of a service, as an instance or a factory."""
+
+    factory: Callable[[], Any] | None
+    lifetime: Lifetime
+    dispose: Callable[[Any], Any] | None = None
+    instance: Any = None
+    created: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    async_locks: weakref.WeakKeyDictionary[
+        asyncio.AbstractEventLoop, asyncio.Lock
+    ] = field(default_factory=weakref.WeakKeyDictionary)
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.factory)
+
+    def async_lock(self) -> asyncio.Lock:
+        """The lock of async creations within the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            return self.async_locks.setdefault(loop, asyncio.Lock())
+
+
+class Services(dict[type, Registration]):
+    """Service container. Services are created lazily on first lookup, once
+    per lifetime, and disposed on host shutdown."""
+
+    def register[T](
+        self,
+        key: type[T],
+        service: T | Callable[[], T] | Callable[[], Awaitable[T]],
+        lifetime: Lifetime = Lifetime.SINGLETON,
+        dispose: Callable[[T], Any] | None = None,
+    ) -> None:
+        """Register a service instance, or a factory creating it. Factories
+        may be async, in which case the service is looked up with `aget`.
+        Services are passed to `dispose`, if set, when disposed."""
+        if registration := self.get(key):
+            raise KeyError(f"Service {key} already exists: {registration}.")
+
+        registration = Registration(None, lifetime, dispose)
+        if isinstance(service, Callable):
+            registration.factory = service
+        elif lifetime != Lifetime.SINGLETON:
+            raise ValueError(f"Service {key} instance must be a singleton.")
+        else:
+            registration.instance, registration.created = service, True
+        super().__setitem__(key, registration)
 
     def __getitem__[T: object](self, key: type[T]) -> T:
-        if not (service := self.get(key)):
+        registration = self._registration(key)
+        if registration.is_async:
+            raise TypeError(f"Service {key} is async, use `aget` instead.")
+        if registration.lifetime == Lifetime.TRANSIENT:
+            return self._validate(key, registration.factory())  # type: ignore
+
+        with registration.lock:  # created once across threads
+            if not registration.created:
+                service = registration.factory()  # type: ignore
+                registration.instance = self._validate(key, service)
+                registration.created = True
+        return registration.instance
+
+    def __setitem__[T](self, key: type[T], value: T | Callable[[], T]) -> None:
+        self.register(key, value)
+
+    async def aget[T: object](self, key: type[T]) -> T:
+        """Look up a service, awaiting its factory if it is async."""
+        registration = self._registration(key)
+        if not registration.is_async:
+            return self[key]
+        if registration.lifetime == Lifetime.TRANSIENT:
+            service = await registration.factory()  # type: ignore
+            return self._validate(key, service)
+
+        async with registration.async_lock():  # created once per loop
+            if registration.created:
+                return registration.instance
+            service = await registration.factory()  # type: ignore
+            service = self._validate(key, service)
+            with registration.lock:  # first created wins across loops
+                if created := not registration.created:
+                    registration.instance = service
+                    registration.created = True
+        if not created:
+            await self._adispose(registration, service)
+        return registration.instance
+
+    def dispose(self, *lifetimes: Lifetime) -> None:
+        """Dispose the created services of lifetimes, or all of them. They
+        are created again on their next lookup."""
+        for registration in self.values():
+            if lifetimes and registration.lifetime not in lifetimes:
+                continue
+            with registration.lock:
+                if not registration.created or not registration.factory:
+                    continue  # instances are never recreated
+                service = registration.instance
+                registration.instance, registration.created = None, False
+            self._dispose(registration, service)
+
+    def on_shutdown(self, host: Any) -> None:
+        """Handle a host shutdown signal, disposing the scoped services, and
+        the singletons unless hosts are served by a daemon."""
+        if Host.is_serving:
+            self.dispose(Lifetime.SCOPED)
+        else:
+            self.dispose(Lifetime.SCOPED, Lifetime.SINGLETON)
+
+    def _registration(self, key: type) -> Registration:
+        if not (registration := self.get(key)):
             raise KeyError(f"Service {key} not found.")
-        if isinstance(service, Callable):
-            service = service()  # type: ignore
+        return registration
+
+    @staticmethod
+    def _validate[T](key: type[T], service: Any) -> T:
         if not isinstance(service, key):
             raise TypeError(
                 f"Service {key} has invalid registration: {service}."
             )
         return service
 
-    def __setitem__[T](self, key: type[T], value: T | Callable[[], T]) -> None:
-        if service := self.get(key):
-            raise KeyError(f"Service {key} already exists: {service}.")
-        super().__setitem__(key, value)
+    @staticmethod
+    def _dispose(registration: Registration, service: Any) -> None:
+        if not registration.dispose:
+            return
+        result = registration.dispose(service)
+        if inspect.isawaitable(result):
+            asyncio.run(result)  # type: ignore
+
+    @staticmethod
+    async def _adispose(registration: Registration, service: Any) -> None:
+        if not registration.dispose:
+            return
+        result = registration.dispose(service)
+        if inspect.isawaitable(result):
+            await result
 
 
 # TODO: create decorator that registers callable as app command for validation
@@ -46,38 +189,126 @@ class Host(ABC):
     """Application host."""
 
     is_started: ClassVar[bool] = False
+    is_serving: ClassVar[bool] = False
+    """Whether hosts are kept warm across commands by a daemon."""
     startup: ClassVar[Signal] = signal(LifecycleEvents.STARTUP)
     shutdown: ClassVar[Signal] = signal(LifecycleEvents.SHUTDOWN)
 
+    stop_timeout: ClassVar[float] = 10.0
+    """Seconds to wait for running background tasks when stopping. Tasks
+    still running are abandoned, and do not delay the process exit."""
+    _executor: ClassVar[ThreadPoolExecutor | None] = None
+
     logger: logging.Logger
     app_settings: settings.Settings | None = None
     dependencies: Services = Services()
 
     def __init__(self, name: str) -> None:
         self.logger = logging.getLogger(name)
+        self.started = time.perf_counter()
+        self.tasks: dict[str, Future] = {}
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        """The executor of lifecycle receivers and background tasks, shared
+        by all hosts."""
+        if Host._executor is None:
+            Host._executor = ThreadPoolExecutor(thread_name_prefix="host")
+        return Host._executor
 
     def start(self, *args: Any, **kwargs: Any) -> None:
         """Start the application."""
         type(self).is_started = True
+        self.started = time.perf_counter()
         self.logger = logging.create_logger(
             self.logger.name, settings.global_settings.logging_path
         )
 
         self.logger.debug(f"Starting up {self.logger.name}...")
-        self.startup.send(self)
+        self.send(self.startup)
 
         if not self.app_settings:
             return
         self.logger.debug(
-            f"Configuration:\n{self.app_settings.model_dump_json(indent=2)}"
+            "Configuration:\n%s",
+            logging.Lazy(self.app_settings.model_dump_json, indent=2),
         )
 
     def stop(self, *args: Any, **kwargs: Any) -> None:
         """Stop the application."""
         type(self).is_started = False
         self.logger.debug(f"Shutting down {self.logger.name}...")
+        self.cancel_tasks()
         self.shutdown.send(self)
 
+        duration = time.perf_counter() - self.started
+        error = sys.exc_info()[1]  # set if stopped by an exception
+        if isinstance(error, typer.Exit) and not error.exit_code:
+            error = None
+        self.logger.debug(
+            f"Finished in {duration:.3f}s.",
+            extra={"duration": duration}
+            | ({"error": repr(error)} if error else {}),
+        )
+        logging.flush_logs()
+
+    def send(self, signal: Signal) -> None:
+        """Send a lifecycle signal, running its receivers concurrently.
+        Async receivers are awaited. Raises the first receiver error."""
+        receivers = list(signal.receivers_for(self))
+        if len(receivers) < 2:  # not worth a thread
+            for receiver in receivers:
+                receive(receiver, self)
+            return
+        futures = [
+            self.executor().submit(receive, receiver, self)
+            for receiver in receivers
+        ]
+        for future in futures:
+            future.result()
+
+    def prefetch[T](self, name: str, work: Callable[[], T]) -> Future[T]:
+        """Start warm-up work in the background. Its result is retrieved by
+        the command with `prefetched`. The work runs on a daemon thread, as
+        blocking work, such as requests, cannot be cancelled."""
+        future: Future[T] = Future()
+
+        def run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(work())
+            except BaseException as error:
+                future.set_exception(error)
+
+        self.tasks[name] = future
+        threading.Thread(
+            target=run, name=f"prefetch-{name}", daemon=True
+        ).start()
+        return future
+
+    def prefetched[T](self, name: str, work: Callable[[], T]) -> T:
+        """The result of background work, waiting for it to finish. The
+        work is run now if it was not prefetched."""
+        future = self.tasks.pop(name, None)
+        if future is None or future.cancel():
+            return work()
+        return future.result()
+
+    def cancel_tasks(self) -> None:
+        """Cancel the pending background tasks, and wait for the running
+        ones to finish."""
+        tasks, self.tasks = self.tasks, {}
+        running = [task for task in tasks.values() if not task.cancel()]
+        done, pending = wait(running, self.stop_timeout)
+        for task in done:
+            if task.exception():
+                self.logger.debug(
+                    f"Background task failed: {task.exception()!r}"
+                )
+        if pending:
+            self.logger.warning(f"Abandoned {len(pending)} background tasks.")
+
     def validate(self) -> None:
         """Validate the host status."""
         if not self.is_started:
@@ -85,15 +316,103 @@ class Host(ABC):
 
     def register(self, app: typer.Typer) -> None:
         """Register commands to the application."""
-        app.command()(self.logs)
+        logs = typer.Typer(name="logs")
+        logs.callback(invoke_without_command=True)(self.logs)
+        logs.command("query")(self.query_logs)
+        app.add_typer(logs)
 
-    def logs(self) -> None:
+    def logs(
+        self,
+        ctx: typer.Context,
+        run: Annotated[
+            int,
+            typer.Option(
+                "--run", "-r", help="The run to show, counting back."
+            ),
+        ] = 1,
+        since: Annotated[
+            datetime | None,
+            typer.Option("--since", help="Show all runs started since."),
+        ] = None,
+        level: Annotated[
+            str | None,
+            typer.Option("--level", help="The minimum level to show."),
+        ] = None,
+        logger: Annotated[
+            str | None,
+            typer.Option("--logger", help="Only show records of a logger."),
+        ] = None,
+        follow: Annotated[
+            bool,
+            typer.Option("--follow", "-f", help="Show new records."),
+        ] = False,
+    ) -> None:
         """View the application logs."""
+        if ctx.invoked_subcommand:
+            return
         self.validate()
+        logging.flush_logs()
         logging.view_logs(
-            settings.global_settings.logging_path / f"{self.logger.name}.log"
+            settings.global_settings.logging_path / f"{self.logger.name}.log",
+            run,
+            since,
+            level,
+            logger,
+            follow,
         )
 
+    def query_logs(
+        self,
+        since: Annotated[
+            datetime | None,
+            typer.Option("--since", help="Only show records since."),
+        ] = None,
+        until: Annotated[
+            datetime | None,
+            typer.Option("--until", help="Only show records until."),
+        ] = None,
+        level: Annotated[
+            str | None,
+            typer.Option("--level", help="The minimum level to show."),
+        ] = None,
+        logger: Annotated[
+            str | None,
+            typer.Option("--logger", help="Only show records of a logger."),
+        ] = None,
+        run: Annotated[
+            str | None,
+            typer.Option("--run", help="Only show records of a run ID."),
+        ] = None,
+        where: Annotated[
+            list[str] | None,
+            typer.Option(
+                "--where", "-w", help="Only show records with a KEY=VALUE."
+            ),
+        ] = None,
+        slower_than: Annotated[
+            float | None,
+            typer.Option(
+                "--slower-than", help="Only show records taking seconds."
+            ),
+        ] = None,
+    ) -> None:
+        """Query the structured logs, as JSON lines."""
+        self.validate()
+        fields = dict(field.split("=", 1) for field in where or [])
+        logging.flush_logs()
+        for record in logging.query_logs(
+            settings.global_settings.logging_path
+            / f"{self.logger.name}.jsonl",
+            since,
+            until,
+            level,
+            logger,
+            run,
+            fields,
+            slower_than,
+        ):
+            typer.echo(record)
+
     def __getitem__[T: object](self, key: type[T]) -> T:
         return typer.Option(
             self.dependencies[key],
@@ -101,3 +420,16 @@ class Host(ABC):
             hidden=True,
             expose_value=False,
         )
+
+
+def receive(receiver: Callable[[Any], Any], sender: Any) -> Any:
+    """Call a signal receiver, awaiting it if it is async."""
+    result = receiver(sender)
+    if inspect.isawaitable(result):
+        return asyncio.run(result)  # type: ignore
+    return result
+
+
+Host.startup.connect(profiling.profiler.on_startup)
+Host.shutdown.connect(profiling.profiler.on_shutdown)
+Host.shutdown.connect(Host.dependencies.on_shutdown)
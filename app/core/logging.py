@@ -1,12 +1,30 @@
 """Logging utilities."""
 
-__all__ = ["setup_logging", "create_logger", "view_logs", "close_files"]
-
+__all__ = [
+    "DropPolicy",
+    "Lazy",
+    "setup_logging",
+    "create_logger",
+    "flush_logs",
+    "view_logs",
+    "query_logs",
+    "close_files",
+]
+
+import atexit
+import copy
+import json
+import queue
 import re
+import time
+import uuid
 from datetime import datetime
+from enum import Enum
+from io import SEEK_END
 from logging import *  # type: ignore
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, NamedTuple
 
 import rich
 import typer
@@ -17,66 +35,446 @@ from rich.text import Text
 app_console = Console()
 err_console = Console(stderr=True)
 
-
-def setup_logging(debug: bool = False) -> None:
-    """Setup logging for the application."""
+MAX_LOG_SIZE = 5 * 2**20
+"""Size of a log file before it is rotated, in bytes."""
+LOG_BACKUPS = 3
+"""Rotated log files to keep."""
+FOLLOW_INTERVAL = 0.5
+"""Interval between reads when following a log file, in seconds."""
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+"""Run header timestamp format."""
+RUN_HEADER_PATTERN = re.compile(
+    r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3})\]=+$"
+)
+"""Run header line of a log file."""
+RECORD_PATTERN = re.compile(
+    r"^\[[^\]]+\] (?P<level>\w+)\s+\[(?P<name>[^\]]+)\] "
+)
+"""First line of a log record."""
+RECORD_ATTRIBUTES = {
+    *makeLogRecord({}).__dict__,
+    "message",
+    "asctime",
+    "run",
+    "command",
+}
+"""Standard log record attributes, excluded from the JSON extra fields."""
+
+listener: QueueListener | None = None
+"""Background listener writing the queued log records."""
+run_id: str = ""
+"""ID of the current run, recorded with each log record."""
+run_command: str = ""
+"""Command of the current run, recorded with each log record."""
+
+
+class DropPolicy(str, Enum):
+    """Logging behavior when the log queue is full."""
+
+    BLOCK = "block"
+    """Wait for the queue to drain."""
+    DROP = "drop"
+    """Drop the record."""
+
+
+class LogRun(NamedTuple):
+    """Run of a log file, indexed by the offset of its first line."""
+
+    offset: int
+    start: datetime
+    id: str = ""
+
+    def entry(self) -> str:
+        """The run's index entry."""
+        return f"{self.offset} {self.start.isoformat()} {self.id}".strip()
+
+    @classmethod
+    def parse(cls, entry: str) -> "LogRun":
+        offset, start, *id = entry.split(" ", 2)
+        return cls(int(offset), datetime.fromisoformat(start), *id)
+
+
+class Lazy:
+    """Log message argument computed only when the record is formatted, on
+    the logging thread."""
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args, **self.kwargs))
+
+
+def setup_logging(
+    debug: bool = False,
+    queue_size: int = 0,
+    drop_policy: DropPolicy = DropPolicy.BLOCK,
+    command: str = "",
+) -> None:
+    """Setup logging for a new run of the application. Records are queued
+    by the logging threads and handled by a background listener thread."""
+    global listener, run_id, run_command
+    run_id, run_command = uuid.uuid4().hex[:12], command
     captureWarnings(True)  # capture warnings from the warnings module
     logger = getLogger()
     logger.setLevel(NOTSET)
+    for handler in logger.handlers[:]:  # replace handlers of previous runs
+        if isinstance(handler, (RichHandler, AsyncHandler)):
+            logger.removeHandler(handler)
 
-    logger.addHandler(stdout_handler())
-    logger.addHandler(stderr_handler())
-    logger.addHandler(debug_handler()) if debug else None
+    files: tuple[Handler, ...] = ()
+    if listener:  # keep the file loggers of previous runs
+        listener.stop()
+        files = tuple(h for h in listener.handlers if h.name)
+
+    handlers = [stdout_handler(), stderr_handler()]
+    handlers += [debug_handler()] if debug else []
+    records: queue.Queue[LogRecord] = queue.Queue(queue_size)
+    listener = QueueListener(
+        records, *handlers, *files, respect_handler_level=True
+    )
+    logger.addHandler(AsyncHandler(records, drop_policy))
+    listener.start()
 
 
 def create_logger(name: str, data_path: Path) -> Logger:
-    """Create a new file logger."""
+    """Create a new file logger. Its records are written to its text and
+    JSON lines files by the logging listener, and to the console by the
+    root logger."""
+    if not listener:
+        setup_logging()
+    assert listener is not None
+
+    handlers = [
+        file_handler(data_path / f"{name}.log"),
+        json_handler(data_path / f"{name}.jsonl"),
+    ]
+    for handler in handlers:
+        handler.set_name(name)
+        handler.addFilter(Filter(name))
+
+    flush_logs()  # replace the file handlers of a previous run
+    previous = [h for h in listener.handlers if h.name == name]
+    listener.handlers = (
+        *(h for h in listener.handlers if h.name != name),
+        *handlers,
+    )
+    for old in previous:
+        old.close()
+
     logger = getLogger(name)
-    logger.propagate = False
+    logger.propagate = True
+    return logger
 
-    logger.addHandler(file_handler(data_path / f"{name}.log"))
+
+def flush_logs() -> None:
+    """Wait for the queued log records to be handled, reporting the records
+    dropped since the last flush."""
+    if listener:
+        listener.queue.join()  # type: ignore
+        if report_dropped():
+            listener.queue.join()  # type: ignore
+
+
+@atexit.register
+def stop_logging() -> None:
+    """Handle the queued log records and stop the listener."""
+    global listener
+    if listener:
+        report_dropped()
+        listener.stop()
+    listener = None
+
+
+def report_dropped() -> int:
+    """Log the number of records dropped by full queues since the last
+    report. Returns the number of dropped records."""
+    dropped = 0
     for handler in getLogger().handlers:
-        logger.addHandler(handler)
-    return logger
+        if isinstance(handler, AsyncHandler):
+            dropped, handler.dropped = dropped + handler.dropped, 0
+    if dropped:
+        getLogger(__name__).warning(
+            f"Dropped {dropped} log records, as the log queue was full."
+        )
+    return dropped
 
 
 def view_logs(
     log_file: Path,
+    run: int = 1,
+    since: datetime | None = None,
+    level: str | None = None,
+    logger: str | None = None,
+    follow: bool = False,
 ) -> None:
-    """View the contents of the log file."""
+    """View a run of a log file, counting back from the current run, or all
+    the runs started since a time. Runs are located with the indexes of the
+    log and its rotated files, so only the shown records are read. Records
+    can be filtered by minimum level and by logger, and new records
+    followed as they are written."""
     if not log_file.exists():
         typer.echo(f"Log file not found: {log_file}")
         raise typer.Exit(1)
 
-    log_contents = log_file.read_text()
-    pattern = r"^\[\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2}\.\d{3}\]=+$"
-    log_entries = re.split(pattern, log_contents, flags=re.MULTILINE)
-    if len(log_entries) < 3:  # ['', ..., 'last run (-2)', 'current run (-1)']
+    levelno = getLevelName(level.upper()) if level else NOTSET
+    if not isinstance(levelno, int):
+        raise typer.BadParameter(f"Invalid log level: {level}")
+
+    segments = run_segments(log_file)
+    runs = list(dict.fromkeys((r.start, r.id) for _, r, _ in segments))
+    if since:
+        selected = [s for s in segments if s[1].start >= since]
+    elif 0 <= run < len(runs):
+        key = runs[-1 - run]
+        selected = [s for s in segments if (s[1].start, s[1].id) == key]
+    else:
+        selected = []
+    if not selected:
         rich.print("[red]No log entries found.[/]")
         raise typer.Exit(1)
-    log_contents = log_entries[-2]
+
+    def selected_lines() -> Iterator[str]:
+        for file, start, end in selected:
+            with open(file, "rb") as stream:
+                stream.seek(start.offset)
+                yield from read_lines(stream, end)
+                if follow and file == log_file and end is None:
+                    yield from follow_lines(log_file, stream)
+        if follow:  # a past run, followed by the new records
+            with open(log_file, "rb") as stream:
+                stream.seek(0, SEEK_END)
+                yield from follow_lines(log_file, stream)
 
     rich.print(f"Log file: {log_file}")
-    rich.print(log_contents.strip())
+    show = True  # continuation lines follow their record
+    try:
+        for line in selected_lines():
+            if record := RECORD_PATTERN.match(line):
+                name = record["name"]
+                show = getLevelName(record["level"]) >= levelno and (
+                    not logger
+                    or name == logger
+                    or name.startswith(f"{logger}.")
+                )
+            elif RUN_HEADER_PATTERN.match(line):
+                show = True
+            if show:
+                app_console.print(line, markup=False, highlight=False)
+    except KeyboardInterrupt:
+        pass  # stopped following
+
+
+def log_files(log_file: Path) -> list[Path]:
+    """A log file and its rotated files, oldest first."""
+    backups = sorted(
+        (
+            f
+            for f in log_file.parent.glob(f"{log_file.name}.*")
+            if f.suffix[1:].isdigit()
+        ),
+        key=lambda f: int(f.suffix[1:]),
+        reverse=True,
+    )
+    return [f for f in [*backups, log_file] if f.exists()]
+
+
+def run_segments(log_file: Path) -> list[tuple[Path, LogRun, int | None]]:
+    """The runs of a log file and its rotated files, oldest first, as their
+    file, index entry and end offset. Runs continued past a rotation have
+    a segment in each file."""
+    segments: list[tuple[Path, LogRun, int | None]] = []
+    for file in log_files(log_file):
+        runs = read_index(file)
+        ends = [r.offset for r in runs[1:]] + [None]
+        segments += [(file, run, end) for run, end in zip(runs, ends)]
+    return segments
+
+
+def read_index(log_file: Path) -> list[LogRun]:
+    """Read the runs of a log file from its index. The index is rebuilt
+    from the run headers if missing."""
+    index = index_path(log_file)
+    if not index.exists():
+        runs: list[LogRun] = []
+        with open(log_file, "rb") as file:
+            for line in iter(file.readline, b""):
+                if header := RUN_HEADER_PATTERN.match(line.decode()):
+                    start = datetime.strptime(header[1], TIMESTAMP_FORMAT)
+                    runs.append(LogRun(file.tell() - len(line), start))
+        index.write_text("".join(f"{run.entry()}\n" for run in runs))
+
+    return [LogRun.parse(entry) for entry in index.read_text().splitlines()]
+
+
+def query_logs(
+    log_file: Path,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    level: str | None = None,
+    logger: str | None = None,
+    run: str | None = None,
+    fields: dict[str, str] | None = None,
+    slower_than: float | None = None,
+) -> Iterator[str]:
+    """Query the records of a JSON lines log file and its rotated files,
+    oldest first. Runs outside the time range are skipped using the run
+    indexes, and only the remaining runs are read and filtered."""
+    levelno = getLevelName(level.upper()) if level else NOTSET
+    if not isinstance(levelno, int):
+        raise typer.BadParameter(f"Invalid log level: {level}")
+
+    files = [(f, read_index(f)) for f in log_files(log_file)]
+    skip = since  # runs ended before this time are skipped
+    if run:  # records of a run are written after its start
+        starts = [r.start for _, runs in files for r in runs if r.id == run]
+        if not starts:
+            return
+        skip = max(skip or starts[0], starts[0])
+
+    for file, runs in files:
+        if not runs or runs[0].offset > 0:  # unindexed records
+            runs.insert(0, LogRun(0, datetime.min))
+        ends = [r.offset for r in runs[1:]] + [None]
+        nexts = [r.start for r in runs[1:]] + [None]
+
+        with open(file, "rb") as stream:
+            for start, end, following in zip(runs, ends, nexts):
+                if until and start.start > until:
+                    return  # runs are ordered by time
+                if skip and following and following <= skip:
+                    continue  # the run ended before the range
+
+                stream.seek(start.offset)
+                for line in read_lines(stream, end):
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    logged = datetime.fromisoformat(record["time"])
+                    name = record["logger"]
+                    if (
+                        (since and logged < since)
+                        or (until and logged > until)
+                        or getLevelName(record["level"]) < levelno
+                        or (run and record.get("run") != run)
+                        or (
+                            logger
+                            and name != logger
+                            and not name.startswith(f"{logger}.")
+                        )
+                        or (
+                            slower_than is not None
+                            and not record.get("duration", -1) >= slower_than
+                        )
+                        or any(
+                            str(record.get(key)) != value
+                            for key, value in (fields or {}).items()
+                        )
+                    ):
+                        continue
+                    yield line
+
+
+def read_lines(file: BinaryIO, end: int | None = None) -> Iterator[str]:
+    """Read the lines of a file from its position up to an offset."""
+    while end is None or file.tell() < end:
+        if not (line := file.readline()):
+            return
+        yield line.decode(errors="replace").rstrip("\n")
+
+
+def follow_lines(log_file: Path, file: BinaryIO) -> Iterator[str]:
+    """Read the lines appended to a log file, until interrupted. Reading
+    restarts from the beginning when the file is rotated."""
+    while True:
+        time.sleep(FOLLOW_INTERVAL)
+        if not log_file.exists():
+            continue
+        if log_file.stat().st_size < file.tell():  # rotated
+            file.close()
+            file = open(log_file, "rb")
+        yield from read_lines(file)
 
 
 def close_files() -> None:
     """Close all file handlers."""
-    for logger in Logger.manager.loggerDict.values():
-        if not isinstance(logger, Logger):
-            continue
+    if not listener:
+        return
 
-        for handler in logger.handlers:
-            if not isinstance(handler, FileHandler):
-                continue
-
-            logger.removeHandler(handler)
-            handler.close()
+    flush_logs()
+    files = [h for h in listener.handlers if isinstance(h, FileHandler)]
+    listener.handlers = tuple(h for h in listener.handlers if h not in files)
+    for handler in files:
+        handler.close()
 
 
 # MARK: Handlers
 
 
+class AsyncHandler(QueueHandler):
+    """Queues records for the logging listener. Records are queued as is,
+    and formatted by the listener's handlers."""
+
+    def __init__(
+        self, records: queue.Queue[LogRecord], drop_policy: DropPolicy
+    ) -> None:
+        super().__init__(records)
+        self.drop_policy = drop_policy
+        self.dropped = 0
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        record.run, record.command = run_id, run_command
+        return record  # formatting is deferred to the listener
+
+    def enqueue(self, record: LogRecord) -> None:
+        if self.drop_policy == DropPolicy.BLOCK:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class PlainFormatter(Formatter):
+    """Formatter stripping rich markup and ANSI escape codes from messages.
+    Records are copied, as they are shared with the console handlers."""
+
+    def formatMessage(self, record: LogRecord) -> str:
+        record = copy.copy(record)
+        record.message = plain(record.message)
+        return super().formatMessage(record)
+
+
+class JsonFormatter(Formatter):
+    """Formatter of records as JSON objects. Extra record attributes, such
+    as timings passed with `extra`, are included as fields."""
+
+    def format(self, record: LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": plain(record.getMessage()),
+            "run": getattr(record, "run", ""),
+            "command": getattr(record, "command", ""),
+            "file": record.filename,
+            "line": record.lineno,
+        }
+        entry |= {
+            key: value
+            for key, value in record.__dict__.items()
+            if key not in RECORD_ATTRIBUTES
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
 def stdout_handler() -> Handler:
     stdout = RichHandler(console=app_console, markup=True, show_time=False)
     stdout.setLevel(INFO)
@@ -99,34 +497,76 @@ def debug_handler() -> Handler:
     return debug
 
 
-def file_handler(log_file: Path) -> Handler:
-    class StripMarkupFilter(Filter):
-        def filter(self, record: LogRecord) -> bool:
-            if hasattr(record, "msg") and isinstance(record.msg, str):
-                record.msg = Text.from_markup(
-                    Text.from_ansi(record.msg).plain
-                ).plain
-            return True  # filter rich markup and ansi escape codes
-
-    log_file.parent.mkdir(parents=True, exist_ok=True)
-    log_file.touch(exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    file_header = f"[{timestamp}]" + "=" * (80 - 2 - len(timestamp) - 1)
-    with open(log_file, "a") as file:
-        file.write(file_header + "\n")
-
-    file = RotatingFileHandler(
-        log_file, maxBytes=2**10, backupCount=0, delay=True
-    )
+def json_handler(log_file: Path) -> Handler:
+    file = RunFileHandler(log_file, MAX_LOG_SIZE, LOG_BACKUPS, header=False)
+    file.setLevel(NOTSET)
+    file.setFormatter(JsonFormatter())
+    return file
+
 
-    file.addFilter(StripMarkupFilter())
+def file_handler(log_file: Path) -> Handler:
+    file = RunFileHandler(log_file, MAX_LOG_SIZE, LOG_BACKUPS)
     file.setLevel(NOTSET)
     file.setFormatter(
-        Formatter(
-            r"[%(asctime)s.%(msecs)03d] %(levelname)-8s "
+        PlainFormatter(
+            r"[%(asctime)s.%(msecs)03d] %(levelname)-8s [%(name)s] "
             r"%(message)s [%(filename)s:%(lineno)d]",
             datefmt=r"%Y-%m-%d %H:%M:%S",
         )
     )
     return file
+
+
+class RunFileHandler(RotatingFileHandler):
+    """Rotating log file handler indexing the start of each run. Each run's
+    offset is recorded in an index next to the log file, which is rotated
+    along with it. If `header` is set, runs start with a header line. Runs
+    that continue past a rotation are indexed again in the new file."""
+
+    def __init__(
+        self,
+        log_file: Path,
+        max_bytes: int,
+        backups: int,
+        header: bool = True,
+    ) -> None:
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(
+            log_file, maxBytes=max_bytes, backupCount=backups, delay=True
+        )
+        self.start = datetime.now()
+        self.run = run_id
+        self.header = header
+        self.write_header()
+
+    def write_header(self) -> None:
+        """Index the run, writing its header if enabled."""
+        timestamp = self.start.strftime(TIMESTAMP_FORMAT)[:-3]
+        header = f"[{timestamp}]" + "=" * (80 - 2 - len(timestamp) - 1)
+        with open(self.baseFilename, "a") as file:
+            offset = file.tell()
+            file.write(header + "\n") if self.header else None
+
+        run = LogRun(offset, self.start, self.run)
+        with open(index_path(Path(self.baseFilename)), "a") as index:
+            index.write(f"{run.entry()}\n")
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        for i in range(self.backupCount, 0, -1):
+            source = f"{self.baseFilename}.{i - 1}" if i > 1 else ""
+            source = index_path(Path(source or self.baseFilename))
+            if source.exists():
+                source.replace(index_path(Path(f"{self.baseFilename}.{i}")))
+        index_path(Path(self.baseFilename)).unlink(missing_ok=True)
+        self.write_header()
+
+
+def index_path(log_file: Path) -> Path:
+    """The run index of a log file."""
+    return log_file.with_name(f"{log_file.name}.idx")
+
+
+def plain(text: str) -> str:
+    """Strip rich markup and ANSI escape codes from a text."""
+    return Text.from_markup(Text.from_ansi(text).plain).plain
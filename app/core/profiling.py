@@ -0,0 +1,194 @@
+"""Profiling utilities."""
+
+__all__ = ["ProfileDump", "Profiler", "profiler", "span"]
+
+import cProfile
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Iterator
+
+from rich.table import Table
+
+from app import STARTED_AT
+
+from .logging import err_console
+
+profiler: "Profiler"
+"""Application profiler."""
+
+SAMPLE_INTERVAL = 0.001
+"""Interval between flame graph stack samples, in seconds."""
+
+
+class ProfileDump(str, Enum):
+    """Profiling data captured with a command's timings."""
+
+    CPROFILE = "cprofile"
+    """Deterministic profile, readable with `pstats` or `snakeviz`."""
+    FLAME = "flame"
+    """Sampled folded stacks, readable with `flamegraph.pl` or speedscope."""
+
+
+class Profiler:
+    """Wall time recorder of named spans, such as HTTP requests and model
+    validation. Spans are always recorded, as they are cheap; when enabled,
+    a timing summary is shown when the host that enabled it stops, and
+    profiling data is optionally captured into a directory."""
+
+    def __init__(self) -> None:
+        self.spans: defaultdict[str, list[float]] = defaultdict(list)
+        self.enabled = False
+        self.dump: ProfileDump | None = None
+        self.path: Path | None = None
+        self.started = STARTED_AT
+        self.depth = 0
+        self.enabled_depth = 0
+        """The hosts running when the profiler was enabled, such as the
+        daemon's."""
+        self.profile: cProfile.Profile | None = None
+        self.sampler: Sampler | None = None
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration: float) -> None:
+        """Record the duration of a span, in seconds."""
+        with self._lock:
+            self.spans[name].append(duration)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Record the wall time of a block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def enable(self, dump: ProfileDump | None, path: Path) -> None:
+        """Show the timings of the next command, capturing profiling data
+        into a directory if `dump` is set."""
+        if self.depth:  # served by a running host, such as the daemon's
+            self.reset()
+        self.enabled, self.dump, self.path = True, dump, path
+        self.enabled_depth = self.depth
+        if dump == ProfileDump.CPROFILE:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        elif dump == ProfileDump.FLAME:
+            self.sampler = Sampler(threading.get_ident())
+            self.sampler.start()
+
+    def on_startup(self, host: Any) -> None:
+        """Handle a host startup signal."""
+        self.depth += 1
+        if "import" not in self.spans:  # only the first command imports
+            self.record("import", time.perf_counter() - STARTED_AT)
+
+    def on_shutdown(self, host: Any) -> None:
+        """Handle a host shutdown signal, finishing the command's profile
+        when the host that enabled it stops."""
+        self.depth = max(0, self.depth - 1)
+        if self.depth > self.enabled_depth or not self.enabled:
+            return
+
+        total = time.perf_counter() - self.started
+        files = self.save(host.logger.name)
+        host.logger.debug(
+            f"Profiled in {total:.3f}s.",
+            extra={"spans": {k: sum(v) for k, v in self.spans.items()}},
+        )
+        err_console.print(self.summary(total))
+        for file in files:
+            err_console.print(f"Saved profile: {file}", soft_wrap=True)
+        self.reset()
+
+    def save(self, name: str) -> list[Path]:
+        """Save the captured profiling data. Returns the created files."""
+        if not self.path or not (self.profile or self.sampler):
+            return []
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = self.path / datetime.now().strftime(f"{name}-%Y%m%d-%H%M%S")
+
+        if self.profile:
+            self.profile.disable()
+            self.profile.dump_stats(file := file.with_suffix(".prof"))
+        elif self.sampler:
+            self.sampler.stop()
+            file = file.with_suffix(".folded")
+            file.write_text(
+                "".join(f"{s} {n}\n" for s, n in self.sampler.stacks.items())
+            )
+        return [file]
+
+    def summary(self, total: float) -> Table:
+        """The timing summary of the recorded spans."""
+        table = Table(title=f"Profile ({total * 1000:,.1f} ms)")
+        table.add_column("Span")
+        for column in ("Count", "Total (ms)", "Mean (ms)", "Share"):
+            table.add_column(column, justify="right")
+        for name, durations in sorted(
+            self.spans.items(), key=lambda item: -sum(item[1])
+        ):
+            if not durations:  # such as imports of served commands
+                continue
+            spent = sum(durations)
+            table.add_row(
+                name,
+                f"{len(durations):,}",
+                f"{spent * 1000:,.1f}",
+                f"{spent / len(durations) * 1000:,.2f}",
+                f"{spent / total:.0%}" if total else "",
+            )
+        return table
+
+    def reset(self) -> None:
+        """Clear the recorded spans and disable the profiler."""
+        with self._lock:
+            self.spans.clear()
+            self.spans["import"] = []  # not imported again
+        self.enabled, self.dump = False, None
+        self.profile = self.sampler = None
+        self.started = time.perf_counter()
+
+
+class Sampler(threading.Thread):
+    """Stack sampler of a thread, counting folded stacks for flame graphs."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame:
+                code = frame.f_code
+                file = Path(code.co_filename).name
+                stack.append(
+                    f"{code.co_qualname} ({file}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._stopped.set()
+        self.join()
+
+
+profiler = Profiler()
+
+
+def span(name: str) -> Any:
+    """Record the wall time of a block with the application profiler."""
+    return profiler.span(name)
@@ -2,15 +2,21 @@
 
 __all__ = ["global_settings", "Environment", "Settings"]
 
+import hashlib
+import json
+import os
 import re
+import sys
 from abc import ABC
 from enum import Enum
+from functools import cache
 from pathlib import Path
-from typing import Any, ClassVar, override
+from typing import Any, ClassVar, Self, override
 
 import dotenv
 import rich
 import typer
+from pydantic import ValidationError
 from pydantic_settings import (
     BaseSettings,
     JsonConfigSettingsSource,
@@ -18,11 +24,16 @@ from pydantic_settings import (
     SettingsConfigDict,
 )
 
-from app import APP_NAME, __version__
+from app import APP_NAME
+
+from . import profiling
 
 global_settings: "GlobalSettings"
 """Global application settings."""
 
+SNAPSHOT_FILE = "settings.snapshot.json"
+"""Snapshot of the resolved settings, in the data directory."""
+
 
 class Environment(str, Enum):
     """Application deployment environment."""
@@ -34,7 +45,6 @@ class Environment(str, Enum):
 class GlobalSettings(BaseSettings):
     APP_ENV: Environment = Environment.PROD
     APP_NAME: ClassVar[str] = APP_NAME
-    VERSION: ClassVar[str] = __version__
     DEV_DATA_PATH: ClassVar[Path] = (
         Path(__file__).parent.parent.parent / "data"
     )
@@ -44,6 +54,16 @@ class GlobalSettings(BaseSettings):
         extra="ignore",
     )
 
+    def __init__(self, **values: Any) -> None:
+        with profiling.span("settings"):
+            super().__init__(**values)
+
+    @property
+    def VERSION(self) -> str:
+        from app import __version__  # resolved on first use
+
+        return __version__
+
     @property
     def data_path(self) -> Path:
         return (
@@ -56,6 +76,10 @@ class GlobalSettings(BaseSettings):
     def logging_path(self) -> Path:
         return self.data_path / "logs"
 
+    @property
+    def profiling_path(self) -> Path:
+        return self.data_path / "profiles"
+
 
 class Settings(BaseSettings, ABC):
     """Configurable settings base class. Reads settings from a JSON file."""
@@ -63,10 +87,48 @@ class Settings(BaseSettings, ABC):
     model_config = GlobalSettings.model_config
     settings_exclude: ClassVar[set[str]] = set()
     """Settings names to exclude from the JSON configuration file."""
+    loaded_keys: ClassVar[dict[type["Settings"], str]] = {}
+    """Fingerprints of the loaded settings' sources, by class."""
+
+    @classmethod
+    def load(cls) -> Self:
+        """Load the settings from their snapshot, resolving their sources
+        only if any changed since it was taken."""
+        with profiling.span("settings"):
+            snapshot = read_snapshot()
+            entry = snapshot.get(cls.__name__, {})
+            if (key := entry.get("key")) == snapshot_key(cls):
+                try:
+                    settings = from_snapshot(cls, entry["values"])
+                    Settings.loaded_keys[cls] = key
+                    return settings
+                except ValidationError:
+                    pass  # taken by an incompatible version
+
+            settings = cls()
+            Settings.loaded_keys[cls] = key = snapshot_key(cls)  # stored
+            snapshot[cls.__name__] = {
+                "key": key,
+                "values": settings.model_dump(
+                    mode="json", exclude=set(cls.model_computed_fields)
+                ),
+            }
+            write_snapshot(snapshot)
+            return settings
+
+    @classmethod
+    def changed(cls) -> list[str]:
+        """The names of the loaded settings whose sources changed since they
+        were loaded."""
+        return [
+            settings.__name__
+            for settings, key in Settings.loaded_keys.items()
+            if snapshot_key(settings) != key
+        ]
 
     @property
     def settings_excluded_fields(self) -> set[str]:
-        return set(self.model_computed_fields.keys()) | self.settings_exclude
+        return set(type(self).model_computed_fields) | self.settings_exclude
 
     @classmethod
     def settings_json_file(cls) -> Path:
@@ -131,6 +193,70 @@ def store_settings(settings: Settings) -> None:
     )
 
 
+def snapshot_key(cls: type[Settings]) -> str:
+    """The fingerprint of a settings class's sources: its JSON and dotenv
+    files, its environment variables and its module."""
+    prefix = cls.model_config.get("env_prefix", "")
+    names = [f"{prefix}{name}".upper() for name in cls.model_fields]
+    env_file = cls.model_config.get("env_file")
+    sources = [
+        cls.settings_json_file(),
+        Path(env_file) if isinstance(env_file, (str, Path)) else None,
+        Path(sys.modules[cls.__module__].__file__ or ""),
+    ]
+    fingerprint = {
+        "files": [
+            [str(file), file.stat().st_mtime_ns if file.exists() else None]
+            for file in sources
+            if file
+        ],
+        "env": [[name, environment().get(name)] for name in names],
+    }
+    encoded = json.dumps(fingerprint, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def from_snapshot[S: Settings](cls: type[S], values: dict[str, Any]) -> S:
+    """Settings from their snapshot values, validated field by field, as
+    validating the model would resolve its sources again."""
+    settings = cls.model_construct()
+    for name, value in values.items():
+        cls.__pydantic_validator__.validate_assignment(settings, name, value)
+    return settings
+
+
+@cache
+def environment() -> dict[str, str]:
+    """The environment variables, by upper-case name. Read once, as the
+    settings are loaded once per process."""
+    return {name.upper(): value for name, value in os.environ.items()}
+
+
+def read_snapshot() -> dict[str, Any]:
+    file = global_settings.data_path / SNAPSHOT_FILE
+    try:
+        return json.loads(file.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_snapshot(snapshot: dict[str, Any]) -> None:
+    """Write the snapshot atomically, readable only by the user, as it may
+    hold secrets from the environment."""
+    file = global_settings.data_path / SNAPSHOT_FILE
+    temp = file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        descriptor = os.open(
+            temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+        )
+        with os.fdopen(descriptor, "w") as stream:
+            json.dump(snapshot, stream, separators=(",", ":"))
+        os.replace(temp, file)
+    except OSError:
+        temp.unlink(missing_ok=True)  # settings are resolved next time
+
+
 def pascal_to_snake(name: str) -> str:
     s1 = re.sub(r"([^_])([A-Z][a-z]+)", r"\1_\2", name)
     snake_case = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", s1).lower()
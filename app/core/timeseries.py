@@ -0,0 +1,32 @@
+"""Time series array types, shared by the brokerages and the journal."""
+
+__all__ = ["CANDLE_DTYPE", "to_datetime64", "to_datetime"]
+
+from datetime import UTC, datetime
+
+import numpy as np
+
+CANDLE_DTYPE = np.dtype(
+    [
+        ("time", "datetime64[us]"),
+        ("open", np.float64),
+        ("high", np.float64),
+        ("low", np.float64),
+        ("close", np.float64),
+        ("volume", np.int64),
+        ("complete", np.bool_),
+    ]
+)
+"""Candlestick array type. Times are the UTC candle open times."""
+
+
+def to_datetime64(value: datetime) -> np.datetime64:
+    """Convert a timestamp to a UTC `datetime64[us]` value."""
+    if value.tzinfo is not None:  # naive timestamps are UTC
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return np.datetime64(value, "us")
+
+
+def to_datetime(value: np.datetime64) -> datetime:
+    """Convert a `datetime64` value to a UTC timestamp."""
+    return value.astype(datetime).replace(tzinfo=UTC)
@@ -0,0 +1,144 @@
+"""Persistent application daemon. Commands forwarded by the client run in
+the daemon's process, reusing its warm hosts, connections and caches."""
+
+__all__ = ["Daemon"]
+
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import BinaryIO
+
+import click
+
+from app import APP_NAME, core
+
+from .client import socket_path
+from .settings import app_settings
+
+
+class Stream(io.TextIOBase):
+    """Output stream forwarded to a client."""
+
+    def __init__(self, name: str, client: BinaryIO, terminal: bool) -> None:
+        self.name = name
+        self.client = client
+        self.terminal = terminal
+
+    def write(self, data: str) -> int:
+        message = {"stream": self.name, "data": data}
+        try:
+            self.client.write(json.dumps(message).encode() + b"\n")
+            self.client.flush()
+        except OSError:
+            pass  # the client disconnected, let the command finish
+        return len(data)
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.terminal
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """Runs a command forwarded by a client."""
+
+    server: "Daemon"
+
+    def handle(self) -> None:
+        if not (line := self.rfile.readline()):
+            return  # probed by `Daemon.is_running`
+        request = json.loads(line)
+        if changed := core.Settings.changed():
+            self.wfile.write(json.dumps({"restart": changed}).encode() + b"\n")
+            self.server.restart()
+        terminal = bool(request.get("terminal"))
+        code = self.server.run(
+            request["argv"],
+            Stream("stdout", self.wfile, terminal),
+            Stream("stderr", self.wfile, terminal),
+        )
+        try:
+            self.wfile.write(json.dumps({"exit": code}).encode() + b"\n")
+        except OSError:
+            pass  # the client disconnected
+
+
+class Daemon(socketserver.UnixStreamServer):
+    """Command daemon listening on a Unix socket. Commands are run one at
+    a time, as they share the process's standard streams."""
+
+    def __init__(self, command: click.Command, path: Path | None = None):
+        self.command = command
+        self.path = path or socket_path()
+        if self.is_running(self.path):
+            raise RuntimeError(f"Daemon is already running: {self.path}")
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        directory = self.path.parent.stat()
+        if directory.st_uid != os.getuid() or directory.st_mode & 0o077:
+            raise RuntimeError(f"Daemon directory is not private: {self.path}")
+        self.path.unlink(missing_ok=True)  # stale socket
+
+        umask = os.umask(0o177)  # created private, before it is bound
+        try:
+            super().__init__(str(self.path), Handler)
+        finally:
+            os.umask(umask)
+
+    def run(self, argv: list[str], stdout: Stream, stderr: Stream) -> int:
+        """Run a command, returning its exit code."""
+        env, debug = core.global_settings.APP_ENV, app_settings.DEBUG_MODE
+        sys_argv, sys.argv = sys.argv, [APP_NAME, *argv]
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                self.command.main(argv, prog_name=APP_NAME)
+        except SystemExit as exit:
+            code = exit.code
+        except Exception:
+            traceback.print_exc(file=stderr)
+            code = 1
+        else:
+            code = 0
+        finally:  # commands must not leak options into the next one
+            sys.argv = sys_argv
+            core.global_settings.APP_ENV = env
+            app_settings.DEBUG_MODE = debug
+
+        if code is None or isinstance(code, int):
+            return code or 0
+        return 1
+
+    def serve(self) -> None:
+        """Serve commands until interrupted."""
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+            self.path.unlink(missing_ok=True)
+
+    def restart(self) -> None:
+        """Replace the daemon's process with a new one, loading the settings
+        and code again."""
+        self.server_close()
+        self.path.unlink(missing_ok=True)
+        core.flush_logs()
+        os.execv(sys.executable, sys.orig_argv)
+
+    @staticmethod
+    def is_running(path: Path) -> bool:
+        """Whether a daemon is listening on a socket."""
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with client:
+            try:
+                client.connect(str(path))
+            except OSError:
+                return False
+        return True
@@ -3,6 +3,7 @@
 __all__ = ["app_host"]
 
 import shutil
+import signal
 
 import rich
 import rich.prompt
@@ -11,6 +12,7 @@ import typer
 from app import core
 
 from . import __name__
+from .daemon import Daemon
 from .settings import app_settings
 
 app_host: "AppHost"
@@ -20,15 +22,30 @@ app_host: "AppHost"
 class AppHost(core.Host):
     app_settings = app_settings
 
-    def start(self, env: core.Environment | None, debug: bool = False) -> None:
+    def start(
+        self,
+        env: core.Environment | None,
+        debug: bool = False,
+        command: str = "",
+        profile: bool = False,
+        profile_dump: core.ProfileDump | None = None,
+    ) -> None:
         core.global_settings.APP_ENV = env or core.global_settings.APP_ENV
         app_settings.DEBUG_MODE = debug or app_settings.DEBUG_MODE
-        core.setup_logging(app_settings.DEBUG_MODE)
+        if profile or profile_dump:
+            core.profiler.enable(profile_dump, app_settings.profiling_path)
+        core.setup_logging(
+            app_settings.DEBUG_MODE,
+            app_settings.LOG_QUEUE_SIZE,
+            app_settings.LOG_DROP_POLICY,
+            command,
+        )
         return super().start()
 
     def register(self, app: typer.Typer) -> None:
         app.command()(self.version)
         app.command()(self.clean)
+        app.command()(self.serve)
         super().register(app)
 
     def version(self) -> None:
@@ -36,6 +53,20 @@ class AppHost(core.Host):
         self.validate()
         rich.print(app_settings.VERSION)
 
+    def serve(self, ctx: typer.Context) -> None:
+        """Serve commands from a persistent daemon. Commands run while the
+        daemon is running are forwarded to it."""
+        self.validate()
+        daemon = Daemon(ctx.find_root().command)
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        core.Host.is_serving = True
+        rich.print(f"Serving commands: {daemon.path}")
+        try:
+            daemon.serve()
+        finally:
+            core.Host.is_serving = False
+
     def clean(self) -> None:
         """Clean the application data directory."""
         self.validate()
@@ -4,3 +4,5 @@ from .cli import *
 from .host import *
 from .models import *
 from .settings import *
+from .store import *
+from .table import *
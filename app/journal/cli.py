@@ -18,5 +18,5 @@ journal_host.register(app)
 @app.callback()
 def main(ctx: typer.Context) -> None:
     """The journal automation application."""
-    journal_host.start()
+    journal_host.start(ctx.invoked_subcommand)
     ctx.call_on_close(journal_host.stop)
@@ -2,17 +2,43 @@
 
 __all__ = ["journal_host"]
 
+import asyncio
+from datetime import datetime
+from typing import Annotated
+
 import rich
 import typer
+from rich.table import Table
 
 from app import core
 
-from . import __name__
-from .models import Broker
+from . import __name__, metrics
+from .indicators import backfill_indicators
+from .models import (
+    Broker,
+    Trade,
+    TradeDirection,
+    TradeEntry,
+    TradeState,
+)
 from .settings import journal_settings
+from .store import JournalStore
+from .watch import Watcher
 
 journal_host: "JournalHost"
 
+BROKER_COMMANDS = {
+    "account",
+    "trades",
+    "sync",
+    "indicators",
+    "stream",
+    "watch",
+}
+"""Commands using the brokerage, which is resolved in the background."""
+STORE_COMMANDS = {"sync", "review", "stats", "indicators", "stream"}
+"""Commands using the journal store, which is opened in the background."""
+
 
 class JournalHost(core.Host):
     app_settings = journal_settings
@@ -20,31 +46,308 @@ class JournalHost(core.Host):
     @property
     def broker(self) -> Broker:
         """Get the brokerage."""
-        return journal_settings.BROKERAGE.resolve()
+        return self.dependencies[Broker]
+
+    @property
+    def store(self) -> JournalStore:
+        """Get the journal store."""
+        return self.dependencies[JournalStore]
+
+    def open_store(self) -> JournalStore:
+        """Get the journal store, opening its connection."""
+        self.store.open()
+        return self.store
+
+    def start(self, command: str | None = None) -> None:
+        """Start the application, warming up what the command uses while
+        its arguments are parsed. The store is retrieved by commands with
+        `prefetched`, once it is opened."""
+        super().start()
+        if command in BROKER_COMMANDS:
+            self.prefetch("broker", lambda: self.broker)
+        if command in STORE_COMMANDS:
+            self.prefetch("store", self.open_store)
 
     def register(self, app: typer.Typer) -> None:
         app.command()(self.account)
         app.command()(self.trades)
+        app.command()(self.sync)
+        app.command()(self.stream)
+        app.command()(self.watch)
+        app.command()(self.review)
+        app.command()(self.stats)
+        app.command()(self.indicators)
         app.command()(journal_settings.config)
         super().register(app)
 
-    def account(self) -> None:
+    def account(
+        self,
+        fresh: Annotated[
+            bool,
+            typer.Option("--fresh", help="Bypass the cached account."),
+        ] = False,
+    ) -> None:
         """Show the OANDA account information."""
         self.validate()
-        account = self.broker.get_account()
+        account = (
+            asyncio.run(self.broker.fetch_account())
+            if fresh
+            else self.broker.get_account(cached=True)
+        )
         self.logger.debug(
-            f"Retrieved account: {account.model_dump_json(indent=2)}"
+            "Retrieved account: %s",
+            core.Lazy(account.model_dump_json, indent=2),
         )
-        rich.print(account)
+        with core.span("render"):
+            rich.print(account)
 
-    def trades(self) -> None:
+    def trades(
+        self,
+        state: Annotated[
+            TradeState,
+            typer.Option("--state", help="The state of the trades to show."),
+        ] = TradeState.OPEN,
+        page_size: Annotated[
+            int | None,
+            typer.Option("--page-size", help="The trades to fetch per page."),
+        ] = None,
+        details: Annotated[
+            bool,
+            typer.Option(
+                "--details", "-D", help="Fetch each trade's full details."
+            ),
+        ] = False,
+        sync: Annotated[
+            bool,
+            typer.Option(
+                "--sync", "-s", help="Only show changes since last sync."
+            ),
+        ] = False,
+        fresh: Annotated[
+            bool,
+            typer.Option("--fresh", help="Bypass the cached trades."),
+        ] = False,
+    ) -> None:
         """Show the account trades."""
         self.validate()
-        trades = self.broker.get_trades()
+        if sync or details:
+            trades = (
+                self.broker.sync_trades()
+                if sync
+                else asyncio.run(
+                    self.broker.fetch_trades(details, cached=not fresh)
+                )
+            )
+            self.logger.debug(
+                "Retrieved trades: %s",
+                core.Lazy(trades.model_dump_json, indent=2),
+            )
+            with core.span("render"):
+                rich.print(trades)
+            return
+
+        count = 0  # trades are shown as pages arrive
+        for count, trade in enumerate(
+            self.broker.iter_trades(state, page_size, cached=not fresh), 1
+        ):
+            self.logger.debug(
+                "Retrieved trade: %s", core.Lazy(trade.model_dump_json)
+            )
+            with core.span("render"):
+                rich.print(trade)
+        self.logger.debug(f"Retrieved {count} trades.")
+
+    def sync(
+        self,
+        full: Annotated[
+            bool,
+            typer.Option("--full", help="Resync the full trade history."),
+        ] = False,
+    ) -> None:
+        """Sync the account trades into the journal."""
+        self.validate()
+        store = self.prefetched("store", self.open_store)
+        trades = self.broker.sync_trades(full)
+        count = store.upsert(trades.trades)
+        if trades.last_transaction_id:  # resumed once the trades are stored
+            self.broker.save_sync(trades.last_transaction_id)
         self.logger.debug(
-            f"Retrieved trades: {trades.model_dump_json(indent=2)}"
+            f"Synced {count} trades.", extra={"trades": count, "full": full}
+        )
+        rich.print(f"Synced {count} trades: {store.path}")
+
+    def stream(
+        self,
+        since: Annotated[
+            str | None,
+            typer.Option(
+                "--since",
+                help="Backfill fills after a transaction, instead of the "
+                "last streamed one.",
+            ),
+        ] = None,
+    ) -> None:
+        """Journal the account trades live, as they are filled and closed."""
+        self.validate()
+        store = self.prefetched("store", self.open_store)
+        for record in self.broker.stream_trades(since):
+            trade = store.get(record.trade_id)
+            if isinstance(record, TradeEntry):
+                if trade:  # replayed, keeping its indicators
+                    continue
+                trade = Trade(entry=record)
+            elif trade is None:  # entered before the journal, or the stream
+                (details,) = asyncio.run(
+                    self.broker.fetch_trade_details([record.trade_id])
+                )
+                trade = Trade(entry=details.entry, exit=record)
+            else:
+                trade = Trade(entry=trade.entry, exit=record)
+            store.upsert([trade])
+
+            self.logger.debug(
+                f"Journaled {type(record).__name__} of {record.trade_id}.",
+                extra={"trade": record.trade_id},
+            )
+            with core.span("render"):
+                rich.print(record)
+
+    def watch(
+        self,
+        interval: Annotated[
+            float | None,
+            typer.Option(
+                "--interval", help="Seconds between polls while trading."
+            ),
+        ] = None,
+        idle_interval: Annotated[
+            float | None,
+            typer.Option(
+                "--idle-interval", help="Maximum seconds between idle polls."
+            ),
+        ] = None,
+    ) -> None:
+        """Show the account changes as they happen."""
+        self.validate()
+        for change in Watcher(self.broker, interval, idle_interval):
+            self.logger.debug(
+                "Account changed: %s", core.Lazy(change.model_dump_json)
+            )
+            with core.span("render"):
+                rich.print(change)
+
+    def review(
+        self,
+        symbol: Annotated[
+            str | None,
+            typer.Option("--symbol", help="Only show trades of a symbol."),
+        ] = None,
+        direction: Annotated[
+            TradeDirection | None,
+            typer.Option("--direction", help="Only show trades of a side."),
+        ] = None,
+        since: Annotated[
+            datetime | None,
+            typer.Option("--since", help="Only show trades entered since."),
+        ] = None,
+        until: Annotated[
+            datetime | None,
+            typer.Option("--until", help="Only show trades entered until."),
+        ] = None,
+        limit: Annotated[
+            int | None,
+            typer.Option("--limit", "-n", help="The trades to show."),
+        ] = None,
+    ) -> None:
+        """Review the journal trades."""
+        self.validate()
+        store = self.prefetched("store", self.open_store)
+        for trade in store.query(symbol, direction, since, until, limit):
+            with core.span("render"):
+                rich.print(trade)
+
+    def stats(
+        self,
+        symbol: Annotated[
+            str | None,
+            typer.Option("--symbol", help="Only include trades of a symbol."),
+        ] = None,
+        direction: Annotated[
+            TradeDirection | None,
+            typer.Option("--direction", help="Only include trades of a side."),
+        ] = None,
+        since: Annotated[
+            datetime | None,
+            typer.Option("--since", help="Only include trades entered since."),
+        ] = None,
+        until: Annotated[
+            datetime | None,
+            typer.Option("--until", help="Only include trades entered until."),
+        ] = None,
+        by: Annotated[
+            metrics.Grouping | None,
+            typer.Option("--by", help="Break the metrics down by a column."),
+        ] = None,
+    ) -> None:
+        """Show the journal performance metrics."""
+        self.validate()
+        store = self.prefetched("store", self.open_store)
+        table = store.table(symbol, direction, since, until)
+        results = {"all": metrics.summarize(table)}
+        if by:
+            results |= metrics.breakdown(table, by)
+
+        output = Table(title=f"Performance ({len(table)} trades)")
+        output.add_column(by.value.title() if by else "")
+        for name in metrics.Metrics.model_fields:
+            output.add_column(name.replace("_", " ").title(), justify="right")
+        for group, result in results.items():
+            output.add_row(
+                group,
+                *(
+                    f"{value:,}" if isinstance(value, int) else f"{value:,.2f}"
+                    for value in result.model_dump().values()
+                ),
+            )
+        with core.span("render"):
+            rich.print(output)
+
+    def indicators(
+        self,
+        symbol: Annotated[
+            str | None,
+            typer.Option("--symbol", help="Only update trades of a symbol."),
+        ] = None,
+        since: Annotated[
+            datetime | None,
+            typer.Option("--since", help="Only update trades entered since."),
+        ] = None,
+        until: Annotated[
+            datetime | None,
+            typer.Option("--until", help="Only update trades entered until."),
+        ] = None,
+    ) -> None:
+        """Compute the indicators at the journal trades' entries."""
+        self.validate()
+        store = self.prefetched("store", self.open_store)
+        table = store.table(symbol, None, since, until)
+        table = backfill_indicators(
+            table,
+            self.broker.get_candles,
+            journal_settings.INDICATOR_TIMEFRAMES,
         )
-        rich.print(trades)
+        count = store.upsert(table)
+        rich.print(f"Updated indicators of {count} trades.")
 
 
 journal_host = JournalHost(__name__.split(".")[-1])
+JournalHost.dependencies.register(
+    Broker,
+    lambda: journal_settings.BROKERAGE.resolve(),
+    dispose=lambda broker: broker.close(),
+)
+JournalHost.dependencies.register(
+    JournalStore,
+    lambda: JournalStore(journal_settings.store_path),
+    dispose=JournalStore.close,
+)
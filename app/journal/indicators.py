@@ -0,0 +1,153 @@
+"""Technical indicators of trade entries."""
+
+__all__ = [
+    "ema",
+    "rsi",
+    "macd",
+    "stochastic",
+    "compute_indicators",
+    "backfill_indicators",
+]
+
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+
+import numpy as np
+
+from app.core.timeseries import to_datetime
+
+from .models import Indicators
+from .table import TradeTable, object_array
+
+INDICATORS_DTYPE = np.dtype(
+    [(name, np.float64) for name in Indicators.model_fields]
+)
+"""Indicator values array type."""
+
+EMA_PERIOD = 20
+RSI_PERIOD = 14
+STOCHASTIC_PERIOD = 14
+MACD_PERIODS = (12, 26)
+WARMUP_CANDLES = 200
+"""Candles fetched before the first entry for the indicators to settle."""
+
+MAX_SCALE = 12.0
+"""Maximum EMA block scaling, as a power of 10."""
+
+CandleSource = Callable[[str, timedelta, datetime, datetime], np.ndarray]
+"""Candle source of a symbol, timeframe and time range."""
+
+
+def ema(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponential moving average with smoothing factor `alpha`, seeded
+    with the first value. The recursion is evaluated in blocks, where it
+    reduces to a scaled cumulative sum."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.empty_like(values)
+    decay = 1.0 - alpha
+    if decay <= 0.0 or not len(values):
+        result[:] = values
+        return result
+
+    # keep the block scaling, decay**-block, within 10**MAX_SCALE
+    block = max(1, int(MAX_SCALE / -np.log10(decay)))
+    powers = decay ** np.arange(min(block, len(values)))
+    state = values[0]
+    for start in range(0, len(values), block):
+        chunk = values[start : start + block]
+        scale = powers[: len(chunk)]
+        chunk = scale * (decay * state + alpha * np.cumsum(chunk / scale))
+        result[start : start + len(chunk)] = chunk
+        state = chunk[-1]
+    return result
+
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Relative strength index, with Wilder's smoothing."""
+    delta = np.diff(close, prepend=close[:1])
+    gain = ema(np.maximum(delta, 0.0), 1 / period)
+    loss = ema(np.maximum(-delta, 0.0), 1 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            loss > 0,
+            100 - 100 / (1 + gain / loss),
+            np.where(gain > 0, 100, 50),
+        )
+
+
+def macd(
+    close: np.ndarray, periods: tuple[int, int] = MACD_PERIODS
+) -> np.ndarray:
+    """Moving average convergence/divergence line."""
+    fast, slow = periods
+    return ema(close, 2 / (fast + 1)) - ema(close, 2 / (slow + 1))
+
+
+def stochastic(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    period: int = STOCHASTIC_PERIOD,
+) -> np.ndarray:
+    """Stochastic oscillator (%K). The first `period - 1` values are NaN."""
+    result = np.full(len(close), np.nan)
+    if len(close) < period:
+        return result
+
+    windows = np.lib.stride_tricks.sliding_window_view
+    highest = windows(high, period).max(axis=1)
+    lowest = windows(low, period).min(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result[period - 1 :] = np.where(
+            highest > lowest,
+            100 * (close[period - 1 :] - lowest) / (highest - lowest),
+            50.0,
+        )
+    return result
+
+
+def compute_indicators(candles: np.ndarray) -> np.ndarray:
+    """Compute the indicators at each candle's close, as an
+    `INDICATORS_DTYPE` array."""
+    close = candles["close"]
+    result = np.empty(len(candles), dtype=INDICATORS_DTYPE)
+    result["ema"] = ema(close, 2 / (EMA_PERIOD + 1))
+    result["stochastic"] = stochastic(candles["high"], candles["low"], close)
+    result["rsi"] = rsi(close)
+    result["macd"] = macd(close)
+    return result
+
+
+def backfill_indicators(
+    table: TradeTable,
+    candles: CandleSource,
+    timeframes: Iterable[timedelta],
+) -> TradeTable:
+    """Return the table with the indicators at each trade's entry. Candles
+    are fetched once per symbol and timeframe, covering all of the symbol's
+    trades, and indicators are sampled from the last candle closed at entry.
+    """
+    indicators = [dict(values) for values in table.indicators]
+    for symbol in np.unique(table.symbol):
+        rows = np.flatnonzero(table.symbol == symbol)
+        entries = table.entry_timestamp[rows]
+        for timeframe in timeframes:
+            start = to_datetime(entries.min()) - timeframe * WARMUP_CANDLES
+            series = candles(
+                str(symbol), timeframe, start, to_datetime(entries.max())
+            )
+            values = compute_indicators(series)
+
+            closes = series["time"] + np.timedelta64(timeframe)
+            index = np.searchsorted(closes, entries, side="right") - 1
+            for row, i in zip(rows, index):
+                if i < 0:
+                    continue  # no candle closed before the entry
+                indicators[row][timeframe] = Indicators.model_construct(
+                    **{
+                        name: float(values[name][i])
+                        for name in values.dtype.names
+                    }
+                )
+    return replace(table, indicators=object_array(indicators))
@@ -0,0 +1,148 @@
+"""Trading journal performance metrics."""
+
+__all__ = [
+    "Grouping",
+    "Metrics",
+    "realized_pnl",
+    "r_multiples",
+    "equity_curve",
+    "summarize",
+    "breakdown",
+]
+
+from enum import Enum
+
+import numpy as np
+from pydantic import BaseModel
+
+from .table import TradeTable
+
+
+class Grouping(str, Enum):
+    """Trade table column to group metrics by."""
+
+    SYMBOL = "symbol"
+    DIRECTION = "direction"
+
+
+class Metrics(BaseModel):
+    """Performance metrics of closed trades."""
+
+    trades: int
+    wins: int
+    win_rate: float
+    total_pnl: float
+    expectancy: float
+    profit_factor: float
+    average_r: float
+    max_drawdown: float
+
+
+def realized_pnl(table: TradeTable) -> np.ndarray:
+    """Realized P/L per trade in the account currency, net of fees. Trades
+    without a brokerage realized P/L fall back to their price move, which
+    is only in the account currency if it is the symbol's quote currency.
+    Open trades are `NaN`."""
+    move = (table.exit_price - table.entry_price) * table.direction
+    pnl = np.where(
+        np.isnan(table.realized_pl), move * table.quantity, table.realized_pl
+    )
+    return pnl - table.fees
+
+
+def r_multiples(table: TradeTable) -> np.ndarray:
+    """Realized P/L per trade in units of initial risk, from the stop loss.
+    The risk is converted to the account currency at the rate implied by
+    the realized P/L. Trades without a stop loss or risk are `NaN`."""
+    move = (table.exit_price - table.entry_price) * table.direction
+    gross = move * table.quantity
+    risk = np.abs(table.entry_price - table.stop_loss) * table.quantity
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(
+            np.isnan(table.realized_pl) | (gross == 0),
+            1.0,
+            table.realized_pl / gross,
+        )
+        risk = risk * np.abs(rate)
+        return np.where(risk > 0, realized_pnl(table) / risk, np.nan)
+
+
+def equity_curve(table: TradeTable) -> tuple[np.ndarray, np.ndarray]:
+    """Cumulative realized P/L of closed trades, ordered by exit time.
+    Returns the exit timestamps and the equity after each trade."""
+    closed = table[table.is_closed].sort("exit_timestamp")
+    return closed.exit_timestamp, np.cumsum(realized_pnl(closed))
+
+
+def summarize(table: TradeTable) -> Metrics:
+    """Compute the metrics of all closed trades."""
+    return compute(table, np.zeros(len(table), dtype=np.intp), 1)[0]
+
+
+def breakdown(table: TradeTable, by: Grouping) -> dict[str, Metrics]:
+    """Compute the metrics of closed trades grouped by a column."""
+    keys, groups = np.unique(getattr(table, by.value), return_inverse=True)
+    if by == Grouping.DIRECTION:
+        keys = np.where(keys > 0, "long", "short")
+    metrics = compute(table, groups, len(keys))
+    return dict(zip(map(str, keys), metrics))
+
+
+def compute(
+    table: TradeTable, groups: np.ndarray, count: int
+) -> list[Metrics]:
+    """Compute the metrics of `count` groups of trades in one pass. Each
+    trade belongs to the group at its index in `groups`."""
+    closed = table.is_closed
+    table, groups = table[closed], groups[closed]
+    order = np.lexsort((table.exit_timestamp, groups))  # by group, then time
+    table, groups = table[order], groups[order]
+
+    pnl, r = realized_pnl(table), r_multiples(table)
+    has_r = ~np.isnan(r)
+
+    def total(
+        weights: np.ndarray, mask: np.ndarray | None = None
+    ) -> np.ndarray:
+        if mask is None:
+            return np.bincount(groups, weights, minlength=count)
+        return np.bincount(groups[mask], weights[mask], minlength=count)
+
+    trades = np.bincount(groups, minlength=count)
+    wins = np.bincount(groups[pnl > 0], minlength=count)
+    profit = total(np.where(pnl > 0, pnl, 0.0))
+    loss = -total(np.where(pnl < 0, pnl, 0.0))
+    r_total = total(r, has_r)
+    r_count = np.bincount(groups[has_r], minlength=count)
+
+    # equity per group; group offsets reset the running peak per group
+    starts = np.searchsorted(groups, np.arange(count))
+    equity = np.cumsum(pnl)
+    offset = np.concatenate(([0.0], equity))[starts]
+    equity = equity - offset[groups]
+    scale = 2 * np.abs(equity).max(initial=0.0) + 1
+    peak = np.maximum.accumulate(equity + groups * scale) - groups * scale
+    drawdown = np.zeros(count)
+    np.maximum.at(drawdown, groups, np.maximum(peak, 0.0) - equity)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rate = np.where(trades > 0, wins / trades, np.nan)
+        expectancy = np.where(trades > 0, (profit - loss) / trades, np.nan)
+        profit_factor = np.where(
+            loss > 0, profit / loss, np.where(profit > 0, np.inf, np.nan)
+        )
+        average_r = np.where(r_count > 0, r_total / r_count, np.nan)
+
+    return [
+        Metrics(
+            trades=int(trades[i]),
+            wins=int(wins[i]),
+            win_rate=float(win_rate[i]),
+            total_pnl=float(profit[i] - loss[i]),
+            expectancy=float(expectancy[i]),
+            profit_factor=float(profit_factor[i]),
+            average_r=float(average_r[i]),
+            max_drawdown=float(drawdown[i]),
+        )
+        for i in range(count)
+    ]
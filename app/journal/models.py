@@ -3,6 +3,7 @@
 __all__ = [
     "Broker",
     "TradeDirection",
+    "TradeState",
     "Indicators",
     "TradeEntry",
     "TradeExit",
@@ -13,34 +14,98 @@ __all__ = [
 
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Protocol
+from typing import Iterable, Iterator, Protocol, runtime_checkable
 
+import numpy as np
+from pydantic import BaseModel
 from pydantic_extra_types.currency_code import Currency
 
 
-class BaseModel(Protocol):
-    @classmethod
-    def model_validate(cls, *args: Any, **kwargs: Any) -> "BaseModel": ...
-    def model_dump_json(self, *args: Any, **kwargs: Any) -> str: ...
-
-
+@runtime_checkable
 class Broker(Protocol):
     """Trading brokerage interface."""
 
-    def get_account(self) -> "Account":
-        """Returns the account information."""
+    def get_account(self, cached: bool = False) -> "Account":
+        """Returns the account information. If `cached` is set, the last
+        retrieved account may be returned while it is refreshed."""
         ...
 
     def get_trades(self) -> "Trades":
         """Returns the account trades."""
         ...
 
+    def iter_trades(
+        self,
+        state: "TradeState",
+        page_size: int | None = None,
+        cached: bool = False,
+    ) -> Iterator["Trade"]:
+        """Returns the account trades, newest first, as they are retrieved.
+        If `cached` is set, the last retrieved trades may be returned."""
+        ...
+
+    def get_candles(
+        self, symbol: str, timeframe: timedelta, start: datetime, end: datetime
+    ) -> np.ndarray:
+        """Returns the candles of a symbol within a time range, as a
+        `CANDLE_DTYPE` array ordered by time."""
+        ...
+
+    def sync_trades(self, full: bool = False) -> "Trades":
+        """Returns the account trades changed since the last
+        synchronization, or all of them if `full` is set."""
+        ...
+
+    def save_sync(self, last_transaction_id: str) -> None:
+        """Records the last transaction the journal is synchronized to, from
+        which the next synchronization resumes."""
+        ...
+
+    def stream_trades(
+        self, since_id: str | None = None
+    ) -> Iterator["TradeEntry | TradeExit"]:
+        """Returns the trades' entries and exits as they are filled, from
+        a live stream. Fills after the `since_id` transaction, or after the
+        last streamed one, are backfilled first."""
+        ...
+
+    def get_trade_changes(self, since_id: str) -> tuple[list["Trade"], str]:
+        """Returns the trades opened and closed since a transaction, and the
+        ID of the last transaction. Partially reduced trades are not
+        included."""
+        ...
+
+    async def fetch_account(self, cached: bool = False) -> "Account":
+        """Returns the account information asynchronously."""
+        ...
+
+    async def fetch_trades(
+        self, details: bool = False, cached: bool = False
+    ) -> "Trades":
+        """Returns the account trades asynchronously, optionally refreshing
+        each trade's details concurrently."""
+        ...
+
+    async def fetch_trade_details(self, ids: Iterable[str]) -> list["Trade"]:
+        """Returns the details of multiple trades concurrently."""
+        ...
+
+    def close(self) -> None:
+        """Waits for pending requests and releases the connections."""
+        ...
+
 
 class TradeDirection(Enum):
     LONG = "long"
     SHORT = "short"
 
 
+class TradeState(str, Enum):
+    OPEN = "open"
+    CLOSED = "closed"
+    ALL = "all"
+
+
 class Indicators(BaseModel):
     ema: float
     stochastic: float
@@ -56,9 +121,9 @@ class TradeEntry(BaseModel):
     quantity: float
     direction: TradeDirection
 
-    stop_loss: float | None
-    take_profit: float | None
-    indicators: dict[timedelta, Indicators]
+    stop_loss: float | None = None
+    take_profit: float | None = None
+    indicators: dict[timedelta, Indicators] = {}
     is_filled: bool = False  # for limit/stop orders
 
 
@@ -67,6 +132,7 @@ class TradeExit(BaseModel):
     exit_timestamp: datetime
     exit_price: float
     fees: float = 0.0
+    realized_pl: float | None = None  # in the account currency, before fees
 
 
 class Trade(BaseModel):
@@ -76,10 +142,12 @@ class Trade(BaseModel):
 
 class Trades(BaseModel):
     trades: list[Trade]
+    last_transaction_id: str | None = None
 
 
 class Account(BaseModel):
     id: str
+    last_transaction_id: str
 
     currency: Currency
     commission: float
@@ -91,3 +159,6 @@ class Account(BaseModel):
     margin_rate: float
     margin_used: float
     margin_available: float
+
+    open_trade_count: int = 0
+    pending_order_count: int = 0
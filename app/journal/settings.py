@@ -3,9 +3,12 @@
 __all__ = ["journal_settings"]
 
 import importlib
+from datetime import timedelta
 from enum import Enum
+from pathlib import Path
 from typing import TYPE_CHECKING
 
+from pydantic import computed_field
 from pydantic_settings import SettingsConfigDict
 
 from app import core
@@ -29,11 +32,28 @@ class JournalSettings(core.Settings):
 
     APP_NAME: str = "journal"
     BROKERAGE: Brokerage = Brokerage.OANDA
+    INDICATOR_TIMEFRAMES: list[timedelta] = [
+        timedelta(minutes=15),
+        timedelta(hours=1),
+        timedelta(hours=4),
+        timedelta(days=1),
+    ]
+
+    WATCH_INTERVAL: float = 5.0
+    """Seconds between account polls while trades or orders are open."""
+    WATCH_IDLE_INTERVAL: float = 300.0
+    """Maximum seconds between account polls while the account is idle."""
 
     settings_exclude = {"APP_NAME"}
     model_config = SettingsConfigDict(
         core.Settings.model_config, env_prefix="JOURNAL_"
     )
 
+    @computed_field
+    @property
+    def store_path(self) -> Path:
+        """Return the path of the journal store."""
+        return core.global_settings.data_path / f"{self.APP_NAME}.db"
 
-journal_settings = JournalSettings()
+
+journal_settings = JournalSettings.load()
@@ -0,0 +1,303 @@
+"""Journal storage."""
+
+__all__ = ["JournalStore"]
+
+import sqlite3
+import threading
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from pydantic import TypeAdapter
+
+from .models import Indicators, Trade, TradeDirection, TradeEntry, TradeExit
+from .table import DIRECTIONS, TradeTable
+
+COLUMNS = (
+    "trade_id",
+    "symbol",
+    "direction",
+    "entry_timestamp",
+    "entry_price",
+    "quantity",
+    "stop_loss",
+    "take_profit",
+    "indicators",
+    "is_filled",
+    "exit_timestamp",
+    "exit_price",
+    "fees",
+    "realized_pl",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    entry_timestamp INTEGER NOT NULL,
+    entry_price REAL NOT NULL,
+    quantity REAL NOT NULL,
+    stop_loss REAL,
+    take_profit REAL,
+    indicators BLOB NOT NULL,
+    is_filled INTEGER NOT NULL,
+    exit_timestamp INTEGER,
+    exit_price REAL,
+    fees REAL,
+    realized_pl REAL
+);
+CREATE INDEX IF NOT EXISTS trades_symbol
+    ON trades (symbol, entry_timestamp);
+CREATE INDEX IF NOT EXISTS trades_entry_timestamp
+    ON trades (entry_timestamp);
+CREATE INDEX IF NOT EXISTS trades_direction
+    ON trades (direction, entry_timestamp);
+"""
+
+UPDATED = tuple(c for c in COLUMNS[1:] if c != "indicators")
+"""Columns overwritten by upserts. Indicators are kept when brokers
+provide none."""
+
+UPSERT = f"""
+INSERT INTO trades ({", ".join(COLUMNS)})
+VALUES ({", ".join("?" * len(COLUMNS))})
+ON CONFLICT (trade_id) DO UPDATE SET
+{", ".join(f"{c} = excluded.{c}" for c in UPDATED)},
+indicators = CASE
+    WHEN CAST(excluded.indicators AS TEXT) = '{{}}' THEN trades.indicators
+    ELSE excluded.indicators
+END
+"""
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+indicators_adapter = TypeAdapter(dict[timedelta, Indicators])
+
+
+class JournalStore:
+    """SQLite journal store. Trades are indexed by ID, symbol, direction
+    and entry time. Timestamps are stored as UTC epoch microseconds."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The database connection, opened on first use."""
+        if self._connection is None:
+            return self.open()
+        return self._connection
+
+    def open(self) -> sqlite3.Connection:
+        """Open the database connection, if not already open. The store may
+        be opened from another thread, so the connection is only shared
+        once its schema is created."""
+        with self._lock:
+            if self._connection is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                connection = sqlite3.connect(
+                    self.path, check_same_thread=False  # one at a time
+                )
+                connection.execute("PRAGMA journal_mode = WAL")
+                connection.execute("PRAGMA synchronous = NORMAL")
+                connection.executescript(SCHEMA)
+                migrate(connection)
+                self._connection = connection
+        return self._connection
+
+    def upsert(self, trades: Iterable[Trade]) -> int:
+        """Insert or update trades in a single transaction. Returns the
+        number of trades written."""
+        with self.connection as connection:
+            cursor = connection.executemany(UPSERT, map(to_row, trades))
+        return cursor.rowcount
+
+    def get(self, trade_id: str) -> Trade | None:
+        """Returns a trade by its ID."""
+        return next(self._select("trade_id = ?", [trade_id]), None)
+
+    def query(
+        self,
+        symbol: str | None = None,
+        direction: TradeDirection | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+    ) -> Iterator[Trade]:
+        """Returns the trades matching the filters, ordered by entry time.
+        The `start` and `end` entry time bounds are inclusive."""
+        where, params = filters(symbol, direction, start, end)
+        return self._select(where, params, limit)
+
+    def table(
+        self,
+        symbol: str | None = None,
+        direction: TradeDirection | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> TradeTable:
+        """Returns the trades matching the filters as a columnar table,
+        without building intermediate trade objects."""
+        where, params = filters(symbol, direction, start, end)
+        rows = self.connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM trades WHERE {where} "
+            "ORDER BY entry_timestamp, trade_id",
+            params,
+        ).fetchall()
+        if not rows:
+            return TradeTable.empty()
+
+        columns = list(zip(*rows))
+        directions = {d.value: v for d, v in DIRECTIONS.items()}
+        columns[COLUMNS.index("direction")] = [
+            directions[d] for d in columns[COLUMNS.index("direction")]
+        ]
+        columns[COLUMNS.index("indicators")] = [
+            indicators_adapter.validate_json(i)
+            for i in columns[COLUMNS.index("indicators")]
+        ]
+        return TradeTable.from_columns(*columns)  # timestamps are in us
+
+    def symbols(self) -> list[str]:
+        """Returns the traded symbols."""
+        rows = self.connection.execute(
+            "SELECT DISTINCT symbol FROM trades ORDER BY symbol"
+        )
+        return [symbol for (symbol,) in rows]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "JournalStore":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def _select(
+        self, where: str, params: list[Any], limit: int | None = None
+    ) -> Iterator[Trade]:
+        query = (
+            f"SELECT {', '.join(COLUMNS)} FROM trades WHERE {where} "
+            "ORDER BY entry_timestamp, trade_id"
+        )
+        if limit is not None:
+            query += " LIMIT ?"
+            params = [*params, limit]
+        return map(from_row, self.connection.execute(query, params))
+
+
+# MARK: Conversion
+
+
+def migrate(connection: sqlite3.Connection) -> None:
+    """Add the columns missing from stores created by older versions."""
+    existing = {
+        row[1] for row in connection.execute("PRAGMA table_info(trades)")
+    }
+    if "realized_pl" not in existing:
+        connection.execute("ALTER TABLE trades ADD COLUMN realized_pl REAL")
+
+
+def filters(
+    symbol: str | None,
+    direction: TradeDirection | None,
+    start: datetime | None,
+    end: datetime | None,
+) -> tuple[str, list[Any]]:
+    clauses: list[str] = []
+    params: list[Any] = []
+    if symbol:
+        clauses.append("symbol = ?")
+        params.append(symbol)
+    if direction:
+        clauses.append("direction = ?")
+        params.append(direction.value)
+    if start:
+        clauses.append("entry_timestamp >= ?")
+        params.append(to_timestamp(start))
+    if end:
+        clauses.append("entry_timestamp <= ?")
+        params.append(to_timestamp(end))
+    return " AND ".join(clauses) or "1", params
+
+
+def to_timestamp(value: datetime) -> int:
+    if value.tzinfo is None:  # naive timestamps are UTC
+        value = value.replace(tzinfo=UTC)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_timestamp(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def to_row(trade: Trade) -> tuple[Any, ...]:
+    entry, exit = trade.entry, trade.exit
+    return (
+        entry.trade_id,
+        entry.symbol,
+        entry.direction.value,
+        to_timestamp(entry.entry_timestamp),
+        entry.entry_price,
+        entry.quantity,
+        entry.stop_loss,
+        entry.take_profit,
+        indicators_adapter.dump_json(entry.indicators),
+        entry.is_filled,
+        to_timestamp(exit.exit_timestamp) if exit else None,
+        exit.exit_price if exit else None,
+        exit.fees if exit else None,
+        exit.realized_pl if exit else None,
+    )
+
+
+def from_row(row: tuple[Any, ...]) -> Trade:
+    (
+        trade_id,
+        symbol,
+        direction,
+        entry_timestamp,
+        entry_price,
+        quantity,
+        stop_loss,
+        take_profit,
+        indicators,
+        is_filled,
+        exit_timestamp,
+        exit_price,
+        fees,
+        realized_pl,
+    ) = row
+
+    entry = TradeEntry.model_construct(
+        trade_id=trade_id,
+        symbol=symbol,
+        entry_timestamp=from_timestamp(entry_timestamp),
+        entry_price=entry_price,
+        quantity=quantity,
+        direction=TradeDirection(direction),
+        stop_loss=stop_loss,
+        take_profit=take_profit,
+        indicators=indicators_adapter.validate_json(indicators),
+        is_filled=bool(is_filled),
+    )
+    exit = (
+        TradeExit.model_construct(
+            trade_id=trade_id,
+            exit_timestamp=from_timestamp(exit_timestamp),
+            exit_price=exit_price,
+            fees=fees,
+            realized_pl=realized_pl,
+        )
+        if exit_timestamp is not None
+        else None
+    )
+    return Trade.model_construct(entry=entry, exit=exit)
@@ -0,0 +1,176 @@
+"""Columnar trade tables."""
+
+__all__ = ["TradeTable"]
+
+from dataclasses import dataclass, fields
+from typing import Any, Iterable, Iterator, Self
+
+import numpy as np
+
+from app.core.timeseries import to_datetime, to_datetime64
+
+from .models import Trade, TradeDirection, TradeEntry, TradeExit, Trades
+
+DIRECTIONS = {TradeDirection.LONG: 1, TradeDirection.SHORT: -1}
+"""Direction column values."""
+
+
+@dataclass(frozen=True)
+class TradeTable:
+    """Trades stored as typed NumPy columns. Timestamps are UTC
+    `datetime64[us]` values, and missing values are `NaN`/`NaT`.
+    Directions are `1` for long and `-1` for short trades."""
+
+    trade_id: np.ndarray
+    symbol: np.ndarray
+    direction: np.ndarray
+    entry_timestamp: np.ndarray
+    entry_price: np.ndarray
+    quantity: np.ndarray
+    stop_loss: np.ndarray
+    take_profit: np.ndarray
+    indicators: np.ndarray
+    is_filled: np.ndarray
+    exit_timestamp: np.ndarray
+    exit_price: np.ndarray
+    fees: np.ndarray
+    realized_pl: np.ndarray
+    """Realized P/L in the account currency, before fees, if known."""
+
+    @classmethod
+    def from_trades(cls, trades: Trades | Iterable[Trade]) -> Self:
+        """Build a table from trades."""
+        if isinstance(trades, Trades):
+            trades = trades.trades
+
+        rows: list[tuple[Any, ...]] = []
+        for trade in trades:
+            entry, exit = trade.entry, trade.exit
+            rows.append(
+                (
+                    entry.trade_id,
+                    entry.symbol,
+                    DIRECTIONS[entry.direction],
+                    to_datetime64(entry.entry_timestamp),
+                    entry.entry_price,
+                    entry.quantity,
+                    entry.stop_loss,
+                    entry.take_profit,
+                    entry.indicators,
+                    entry.is_filled,
+                    to_datetime64(exit.exit_timestamp) if exit else None,
+                    exit.exit_price if exit else None,
+                    exit.fees if exit else None,
+                    exit.realized_pl if exit else None,
+                )
+            )
+        return cls.from_columns(*zip(*rows)) if rows else cls.empty()
+
+    @classmethod
+    def from_columns(cls, *columns: Iterable[Any]) -> Self:
+        """Build a table from columns of Python values, in field order.
+        `None` values are converted to `NaN`/`NaT`."""
+        (
+            trade_id,
+            symbol,
+            direction,
+            entry_timestamp,
+            entry_price,
+            quantity,
+            stop_loss,
+            take_profit,
+            indicators,
+            is_filled,
+            exit_timestamp,
+            exit_price,
+            fees,
+            realized_pl,
+        ) = map(list, columns)
+
+        return cls(
+            trade_id=np.array(trade_id, dtype=np.str_),
+            symbol=np.array(symbol, dtype=np.str_),
+            direction=np.array(direction, dtype=np.int8),
+            entry_timestamp=np.array(entry_timestamp, dtype="datetime64[us]"),
+            entry_price=np.array(entry_price, dtype=np.float64),
+            quantity=np.array(quantity, dtype=np.float64),
+            stop_loss=np.array(stop_loss, dtype=np.float64),
+            take_profit=np.array(take_profit, dtype=np.float64),
+            indicators=object_array(indicators),
+            is_filled=np.array(is_filled, dtype=np.bool_),
+            exit_timestamp=np.array(exit_timestamp, dtype="datetime64[us]"),
+            exit_price=np.array(exit_price, dtype=np.float64),
+            fees=np.array(fees, dtype=np.float64),
+            realized_pl=np.array(realized_pl, dtype=np.float64),
+        )
+
+    @classmethod
+    def empty(cls) -> Self:
+        """Build an empty table."""
+        return cls.from_columns(*([] for _ in fields(cls)))
+
+    @property
+    def is_closed(self) -> np.ndarray:
+        """Mask of the closed trades."""
+        return ~np.isnat(self.exit_timestamp)
+
+    def sort(self, column: str = "entry_timestamp") -> Self:
+        """Return the table sorted by a column."""
+        return self[np.argsort(getattr(self, column), kind="stable")]
+
+    def to_trades(self) -> Trades:
+        """Convert the table back to trades."""
+        return Trades(trades=list(self))
+
+    def __len__(self) -> int:
+        return len(self.trade_id)
+
+    def __getitem__(self, index: Any) -> Self:
+        """Select rows by mask, slice or indices."""
+        return type(self)(
+            **{f.name: getattr(self, f.name)[index] for f in fields(self)}
+        )
+
+    def __iter__(self) -> Iterator[Trade]:
+        for i in range(len(self)):
+            entry = TradeEntry(
+                trade_id=str(self.trade_id[i]),
+                symbol=str(self.symbol[i]),
+                entry_timestamp=to_datetime(self.entry_timestamp[i]),
+                entry_price=float(self.entry_price[i]),
+                quantity=float(self.quantity[i]),
+                direction=(
+                    TradeDirection.LONG
+                    if self.direction[i] > 0
+                    else TradeDirection.SHORT
+                ),
+                stop_loss=to_float(self.stop_loss[i]),
+                take_profit=to_float(self.take_profit[i]),
+                indicators=self.indicators[i],
+                is_filled=bool(self.is_filled[i]),
+            )
+            exit = (
+                TradeExit(
+                    trade_id=entry.trade_id,
+                    exit_timestamp=to_datetime(self.exit_timestamp[i]),
+                    exit_price=float(self.exit_price[i]),
+                    fees=float(self.fees[i]),
+                    realized_pl=to_float(self.realized_pl[i]),
+                )
+                if not np.isnat(self.exit_timestamp[i])
+                else None
+            )
+            yield Trade(entry=entry, exit=exit)
+
+
+# MARK: Conversion
+
+
+def to_float(value: np.floating) -> float | None:
+    return None if np.isnan(value) else float(value)
+
+
+def object_array(values: list[Any]) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
@@ -0,0 +1,116 @@
+"""Account state watcher."""
+
+__all__ = ["ChangeKind", "TradeChange", "AccountChange", "Watcher"]
+
+import logging
+import time
+from enum import Enum
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from .models import Account, Broker, Trade
+from .settings import journal_settings
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_FIELDS = ("balance", "margin_used", "margin_available")
+"""Account fields whose moves are reported."""
+
+
+class ChangeKind(str, Enum):
+    OPENED = "opened"
+    CLOSED = "closed"
+
+
+class TradeChange(BaseModel):
+    kind: ChangeKind
+    trade: Trade
+
+
+class AccountChange(BaseModel):
+    name: str
+    previous: float
+    current: float
+
+
+class Watcher:
+    """Changes of an account's state, polled from its brokerage. Each poll
+    retrieves the account only, and the changed trades are retrieved when
+    its last transaction moves. Polls are `interval` seconds apart while
+    trades or orders are open, and back off up to `idle_interval` seconds
+    while the account is idle."""
+
+    def __init__(
+        self,
+        broker: Broker,
+        interval: float | None = None,
+        idle_interval: float | None = None,
+    ) -> None:
+        self.broker = broker
+        self.interval = interval or journal_settings.WATCH_INTERVAL
+        self.idle_interval = max(
+            idle_interval or journal_settings.WATCH_IDLE_INTERVAL,
+            self.interval,
+        )
+        self.delay = self.interval
+        """Seconds until the next poll."""
+        self.account: Account | None = None
+        """The account of the last poll."""
+        self.last_id: str | None = None
+        """The ID of the last transaction reflected by the changes."""
+
+    def __iter__(self) -> Iterator[TradeChange | AccountChange]:
+        if self.account is None:
+            self.poll()
+        while True:
+            logger.debug(f"Polling the account in {self.delay:.1f}s.")
+            time.sleep(self.delay)
+            yield from self.poll()
+
+    def poll(self) -> list[TradeChange | AccountChange]:
+        """Retrieve the account, returning its changes since the last poll
+        and adapting the polling interval."""
+        account = self.broker.get_account()
+        changes: list[TradeChange | AccountChange] = []
+        if self.account is None:  # nothing to diff against
+            self.last_id = account.last_transaction_id
+        else:
+            changes += self.diff(self.account, account)
+            changes += self.trade_changes(account)
+        self.account = account
+
+        is_active = account.open_trade_count or account.pending_order_count
+        if changes or is_active:
+            self.delay = self.interval
+        else:
+            self.delay = min(self.delay * 2, self.idle_interval)
+        return changes
+
+    def trade_changes(self, account: Account) -> list[TradeChange]:
+        """The trades opened and closed since the last changes, retrieved
+        only if the account has new transactions."""
+        if self.last_id and int(account.last_transaction_id) <= int(
+            self.last_id
+        ):
+            return []
+        trades, self.last_id = self.broker.get_trade_changes(
+            self.last_id or account.last_transaction_id
+        )
+        return [
+            TradeChange(
+                kind=ChangeKind.CLOSED if trade.exit else ChangeKind.OPENED,
+                trade=trade,
+            )
+            for trade in trades
+        ]
+
+    @staticmethod
+    def diff(previous: Account, current: Account) -> list[AccountChange]:
+        """The moves of the reported fields between two accounts."""
+        return [
+            AccountChange(name=name, previous=before, current=after)
+            for name in ACCOUNT_FIELDS
+            if (before := getattr(previous, name))
+            != (after := getattr(current, name))
+        ]
@@ -2,23 +2,62 @@
 
 __all__ = ["app"]
 
+import importlib
 import sys
-from typing import Annotated
+from functools import cached_property
+from typing import Annotated, Any
 
+import click
 import typer
+from typer.core import TyperGroup
 
-from app import core, journal
+from app import core
 
 from .host import app_host
 from .settings import app_settings
 
+SUBCOMMANDS = {
+    "journal": ("app.journal.cli:app", "The journal automation application.")
+}
+"""Lazily imported sub-applications, by name, as their import path and
+help text."""
+
+
+class LazyGroup(TyperGroup):
+    """Command group with lazily imported sub-applications."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        for name, (path, help) in SUBCOMMANDS.items():
+            self.add_command(LazySubcommand(name, path, help))
+
+
+class LazySubcommand(TyperGroup):
+    """Placeholder of a sub-application, which is imported when invoked.
+    Listing it in the help does not import it."""
+
+    def __init__(self, name: str, path: str, help: str) -> None:
+        super().__init__(name=name, help=help)
+        self.path = path
+
+    @cached_property
+    def command(self) -> click.Command:
+        """The sub-application's command."""
+        module, name = self.path.split(":")
+        app = getattr(importlib.import_module(module), name)
+        return typer.main.get_command(app)
+
+    def make_context(self, *args: Any, **kwargs: Any) -> click.Context:
+        return self.command.make_context(*args, **kwargs)
+
+
 app = typer.Typer(
     name=core.global_settings.APP_NAME,
+    cls=LazyGroup,
     context_settings={"help_option_names": ["-h", "--help"]},
     add_completion=False,
 )
 app_host.register(app)
-app.add_typer(journal.app)
 
 
 @app.callback()
@@ -34,11 +73,21 @@ def main(
             "--debug", "-d", help="Log debug messages to the console."
         ),
     ] = False,
+    profile: Annotated[
+        bool,
+        typer.Option("--profile", help="Show where the command spent time."),
+    ] = False,
+    profile_dump: Annotated[
+        core.ProfileDump | None,
+        typer.Option(
+            "--profile-dump", help="Save profiling data of the command."
+        ),
+    ] = None,
 ) -> None:
     """Trading Journal CLI."""
-    app_host.start(env, debug_mode)
+    command = " ".join(sys.argv[1:])
+    app_host.start(env, debug_mode, command, profile, profile_dump)
     ctx.call_on_close(app_host.stop)
 
     logger = app_host.logger
-    command = " ".join(sys.argv[1:])
     logger.debug(f"Executing: [purple]{app_settings.APP_NAME} {command}[/]")
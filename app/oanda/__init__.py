@@ -1,5 +1,11 @@
 """OANDA application package."""
 
 from .api import *
+from .cache import *
+from .candles import *
 from .models import *
+from .scheduler import *
 from .settings import *
+from .stream import *
+from .sync import *
+from .transport import *
@@ -1,33 +1,177 @@
 """OANDA API package."""
 
-import requests
+import asyncio
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from app.journal import models as journal
 
 from . import models
+from .cache import response_cache
+from .candles import candle_store
 from .settings import oanda_settings
+from .transport import decode, transport
 
 
-def get_account() -> models.Account:
-    """Retrieves the account information."""
-    response = requests.get(
-        models.Account.path(), headers=oanda_settings.request_headers
-    )
-    response.raise_for_status()
-    return models.Account.model_validate(response.json()["account"])
+def get_account(cached: bool = False) -> models.Account:
+    """Retrieves the account information. If `cached` is set, the last
+    retrieved account is returned and refreshed in the background."""
+    ttl = oanda_settings.ACCOUNT_CACHE_TTL if cached else None
+    body = _get(models.Account.path(), ttl=ttl)
+    return decode(body, models.Account, "account")
 
 
-def get_trades() -> models.Trades:
-    """Retrieves the account trades."""
-    response = requests.get(
-        models.Trades.path(), headers=oanda_settings.request_headers
-    )
-    response.raise_for_status()
-    return models.Trades.model_validate(response.json())
+def get_trades(
+    state: models.TradeStateFilter | None = None,
+) -> models.Trades:
+    """Retrieves the account trades, optionally filtered by state."""
+    params = {"state": state.value} if state else None
+    response = transport.get(models.Trades.path(), params=params)
+    return decode(response, models.Trades)
+
+
+def iter_trades(
+    state: str = models.TradeStateFilter.CLOSED,
+    page_size: int | None = None,
+    instrument: str | None = None,
+    cached: bool = False,
+) -> Iterator[models.Trade]:
+    """Iterates over the account trades, newest first. Trades are retrieved
+    one page at a time, paging backwards through the account history.
+    The state is a case-insensitive `TradeStateFilter` value. If `cached`
+    is set, cached pages are returned and refreshed in the background."""
+    ttl = oanda_settings.TRADES_CACHE_TTL if cached else None
+    count = page_size or oanda_settings.PAGE_SIZE
+    state = models.TradeStateFilter(state.upper()).value
+    params: dict[str, str | int] = {"state": state, "count": count}
+    if instrument:
+        params["instrument"] = instrument
+
+    before_id: int | None = None
+    while True:
+        body = _get(models.Trades.path(), params=params, ttl=ttl)
+        page = decode(body, models.Trades).trades
+        for trade in page:
+            if before_id is None or int(trade.id) <= before_id:
+                yield trade
+
+        if len(page) < count:
+            return
+        before_id = int(page[-1].id) - 1  # `beforeID` is inclusive
+        params = params | {"beforeID": before_id}
+
+
+def get_trade(id: str) -> models.Trade:
+    """Retrieves the details of a trade."""
+    response = transport.get(models.Trade.path(id))
+    return decode(response, models.Trade, "trade")
 
 
 def get_orders() -> models.Orders:
     """Retrieves the account orders (unfilled trades)."""
-    response = requests.get(
-        models.Account.path(), headers=oanda_settings.request_headers
+    response = transport.get(models.Orders.path())
+    return decode(response, models.Orders)
+
+
+def get_changes(since_id: str) -> models.AccountChanges:
+    """Retrieves the account changes since a transaction."""
+    response = transport.get(
+        models.AccountChanges.path(), params={"sinceTransactionID": since_id}
     )
-    response.raise_for_status()
-    return models.Orders.model_validate(response.json())
+    return decode(response, models.AccountChanges)
+
+
+def get_trade_changes(since_id: str) -> tuple[list[journal.Trade], str]:
+    """Retrieves the trades opened and closed since a transaction, as
+    journal trades, and the ID of the last transaction. Trades opened and
+    then closed are only returned closed."""
+    changes = get_changes(since_id)
+    trades = {
+        trade.id: journal.Trade(entry=trade.entry, exit=trade.exit)
+        for trade in changes.changes.trades_opened
+        + changes.changes.trades_closed
+    }
+    return list(trades.values()), changes.last_transaction_id
+
+
+def get_candles(
+    instrument: str, timeframe: timedelta, start: datetime, end: datetime
+) -> np.ndarray:
+    """Retrieves the mid candles of an instrument within a time range, as a
+    `CANDLE_DTYPE` array. Candles are served from the local candle cache,
+    and only the missing ranges are requested."""
+    granularity = models.Granularity.from_timedelta(timeframe)
+    return candle_store.get(instrument, granularity, start, end)
+
+
+def close() -> None:
+    """Waits for background refreshes and closes the connections."""
+    response_cache.wait(oanda_settings.REQUEST_TIMEOUT)
+    transport.close()
+
+
+def _get(
+    path: str, params: dict[str, Any] | None = None, ttl: float | None = None
+) -> bytes:
+    """Retrieves a response body. If `ttl` is set, the body is served from
+    the response cache, and refreshed once older than `ttl` seconds."""
+    if ttl is None:
+        return transport.get(path, params=params).content
+    return response_cache.get(path, params, ttl)
+
+
+# MARK: Async
+
+
+async def fetch_account(cached: bool = False) -> models.Account:
+    """Retrieves the account information asynchronously."""
+    if cached:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            transport.executor, get_account, True
+        )
+    response = await transport.aget(models.Account.path())
+    return decode(response, models.Account, "account")
+
+
+async def fetch_trades(
+    details: bool = False, cached: bool = False
+) -> models.Trades:
+    """Retrieves the account trades asynchronously. If `details` is set,
+    each trade is refreshed from its own endpoint concurrently."""
+    if cached:
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(
+            transport.executor,
+            partial(
+                response_cache.get,
+                models.Trades.path(),
+                ttl=oanda_settings.TRADES_CACHE_TTL,
+            ),
+        )
+    else:
+        body = (await transport.aget(models.Trades.path())).content
+    trades = decode(body, models.Trades)
+    if details:
+        trades.trades = await fetch_trade_details(t.id for t in trades.trades)
+    return trades
+
+
+async def fetch_orders() -> models.Orders:
+    """Retrieves the account orders asynchronously."""
+    response = await transport.aget(models.Orders.path())
+    return decode(response, models.Orders)
+
+
+async def fetch_trade(id: str) -> models.Trade:
+    """Retrieves the details of a trade asynchronously."""
+    response = await transport.aget(models.Trade.path(id))
+    return decode(response, models.Trade, "trade")
+
+
+async def fetch_trade_details(ids: Iterable[str]) -> list[models.Trade]:
+    """Retrieves the details of multiple trades concurrently."""
+    return list(await asyncio.gather(*(fetch_trade(id) for id in ids)))
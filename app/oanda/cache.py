@@ -0,0 +1,127 @@
+"""OANDA response cache."""
+
+__all__ = ["ResponseCache", "response_cache"]
+
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any
+
+import requests
+
+from app import core
+
+from .settings import oanda_settings
+from .transport import transport
+
+response_cache: "ResponseCache"
+"""Shared OANDA response cache."""
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Stale-while-revalidate cache of raw response bodies. Cached bodies
+    are served at once; bodies older than their time-to-live are refreshed
+    in the background, revalidating with the response's `ETag` if any."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self._path = path
+        self._refreshes: dict[str, Thread] = {}
+        self._lock = Lock()
+
+    @property
+    def path(self) -> Path:
+        """The cache directory."""
+        return self._path or (
+            core.global_settings.data_path
+            / oanda_settings.APP_NAME
+            / "responses"
+        )
+
+    def get(
+        self, url: str, params: dict[str, Any] | None = None, ttl: float = 0
+    ) -> bytes:
+        """Returns a response body, from the cache if available. Bodies
+        older than `ttl` seconds are refreshed in the background."""
+        key = self.key(url, params)
+        body, _ = self.files(key)
+        try:
+            content = body.read_bytes()
+            age = time.time() - body.stat().st_mtime
+        except FileNotFoundError:
+            return self.fetch(key, url, params)
+
+        if age >= ttl:
+            self.refresh(key, url, params)
+        return content
+
+    def fetch(
+        self, key: str, url: str, params: dict[str, Any] | None = None
+    ) -> bytes:
+        """Request a response body and cache it. Cached bodies with an
+        `ETag` are revalidated instead of being downloaded again."""
+        body, etag = self.files(key)
+        headers = {}
+        if body.exists() and etag.exists():
+            headers["If-None-Match"] = etag.read_text()
+
+        response = transport.get(url, params=params, headers=headers)
+        if response.status_code == 304:  # not modified
+            body.touch()
+            return body.read_bytes()
+
+        body.parent.mkdir(parents=True, exist_ok=True)
+        temp = body.with_suffix(".tmp")
+        temp.write_bytes(response.content)
+        temp.replace(body)
+        if tag := response.headers.get("ETag"):
+            etag.write_text(tag)
+        else:
+            etag.unlink(missing_ok=True)
+        return response.content
+
+    def refresh(
+        self, key: str, url: str, params: dict[str, Any] | None = None
+    ) -> None:
+        """Refresh a cached body in the background, unless already being
+        refreshed."""
+
+        def run() -> None:
+            try:
+                self.fetch(key, url, params)
+            except requests.RequestException as error:
+                logger.warning(f"Failed to refresh {url}: {error}")
+            finally:
+                with self._lock:
+                    self._refreshes.pop(key, None)
+
+        with self._lock:
+            if key in self._refreshes:
+                return
+            thread = Thread(target=run, name=f"oanda-refresh-{key[:8]}")
+            self._refreshes[key] = thread
+        thread.start()
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Wait for the background refreshes to finish."""
+        with self._lock:
+            threads = list(self._refreshes.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def files(self, key: str) -> tuple[Path, Path]:
+        """The body and entity tag files of a cached response."""
+        return self.path / f"{key}.json", self.path / f"{key}.etag"
+
+    @staticmethod
+    def key(url: str, params: dict[str, Any] | None = None) -> str:
+        """The cache key of a request."""
+        request = json.dumps([url, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode()).hexdigest()[:32]
+
+
+response_cache = ResponseCache()
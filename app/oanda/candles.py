@@ -0,0 +1,201 @@
+"""OANDA candle cache."""
+
+__all__ = ["CandleStore", "candle_store"]
+
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+
+from app import core
+from app.core.timeseries import CANDLE_DTYPE, to_datetime, to_datetime64
+
+from . import models
+from .settings import oanda_settings
+from .transport import decode, transport
+
+MAX_CANDLES = 5000
+"""Maximum number of candles per request."""
+
+candle_store: "CandleStore"
+"""Shared OANDA candle cache."""
+
+Range = tuple[np.datetime64, np.datetime64]
+"""Half-open time range."""
+
+
+class CandleStore:
+    """Local candle cache, keyed by instrument and granularity. Each series
+    is stored as a memory-mappable `.npy` array of complete candles, along
+    with the time ranges it covers. Only missing ranges are fetched."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self._path = path
+
+    @property
+    def path(self) -> Path:
+        """The cache directory."""
+        return self._path or (
+            core.global_settings.data_path
+            / oanda_settings.APP_NAME
+            / "candles"
+        )
+
+    def get(
+        self,
+        instrument: str,
+        granularity: models.Granularity,
+        start: datetime,
+        end: datetime,
+    ) -> np.ndarray:
+        """Returns the candles within a time range, fetching the ranges
+        that are not cached."""
+        requested = (to_datetime64(start), to_datetime64(end))
+        series, ranges = self.load(instrument, granularity)
+
+        gaps = subtract(requested, ranges)
+        if gaps:
+            step = np.timedelta64(granularity.duration)
+            fetched = [
+                fetch_candles(instrument, granularity, *request)
+                for request in plan(gaps, step * MAX_CANDLES)
+            ]
+            series, ranges = merge(series, ranges, fetched, gaps)
+            self.save(instrument, granularity, series, ranges)
+
+        times = series["time"]
+        lower, upper = np.searchsorted(times, requested)
+        return series[lower:upper]
+
+    def load(
+        self, instrument: str, granularity: models.Granularity
+    ) -> tuple[np.ndarray, list[Range]]:
+        """Load a cached series and its covered ranges."""
+        data, index = self.files(instrument, granularity)
+        if not (data.exists() and index.exists()):
+            return np.empty(0, dtype=CANDLE_DTYPE), []
+
+        ranges = [
+            (np.datetime64(start, "us"), np.datetime64(end, "us"))
+            for start, end in json.loads(index.read_text())
+        ]
+        return np.load(data, mmap_mode="r"), ranges
+
+    def save(
+        self,
+        instrument: str,
+        granularity: models.Granularity,
+        series: np.ndarray,
+        ranges: list[Range],
+    ) -> None:
+        """Store a series and its covered ranges atomically."""
+        data, index = self.files(instrument, granularity)
+        data.parent.mkdir(parents=True, exist_ok=True)
+
+        temp = data.with_suffix(".tmp")
+        with open(temp, "wb") as file:
+            np.save(file, series)
+        temp.replace(data)
+
+        temp = index.with_suffix(".tmp")
+        temp.write_text(json.dumps([[str(s), str(e)] for s, e in ranges]))
+        temp.replace(index)
+
+    def files(
+        self, instrument: str, granularity: models.Granularity
+    ) -> tuple[Path, Path]:
+        """The data and index files of a series."""
+        name = f"{instrument}_{granularity.value}"
+        return self.path / f"{name}.npy", self.path / f"{name}.json"
+
+
+def fetch_candles(
+    instrument: str,
+    granularity: models.Granularity,
+    start: np.datetime64,
+    end: np.datetime64,
+) -> np.ndarray:
+    """Retrieves the candles within a time range in a single request."""
+    response = transport.get(
+        models.Candles.path(instrument),
+        params={
+            "granularity": granularity.value,
+            "price": "M",
+            "from": to_datetime(start).isoformat(),
+            "to": to_datetime(end).isoformat(),
+        },
+    )
+    candles = decode(response, models.Candles).to_array()
+    times = candles["time"]
+    return candles[(times >= start) & (times < end)]
+
+
+# MARK: Ranges
+
+
+def subtract(requested: Range, ranges: list[Range]) -> list[Range]:
+    """The parts of a range not covered by sorted, disjoint ranges."""
+    start, end = requested
+    gaps: list[Range] = []
+    for lower, upper in ranges:
+        if upper <= start or lower >= end:
+            continue
+        if lower > start:
+            gaps.append((start, lower))
+        start = max(start, upper)
+    if start < end:
+        gaps.append((start, end))
+    return gaps
+
+
+def union(ranges: list[Range]) -> list[Range]:
+    """Merge overlapping and adjacent ranges."""
+    merged: list[Range] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def plan(gaps: list[Range], max_span: np.timedelta64) -> list[Range]:
+    """Plan the fewest requests covering sorted gaps, each spanning at most
+    `max_span`. Nearby gaps are fetched together, re-fetching the cached
+    candles between them, when they fit in a single request."""
+    requests: list[Range] = []
+    for start, end in gaps:
+        if requests and end - requests[-1][0] <= max_span:
+            requests[-1] = (requests[-1][0], end)
+            continue
+        while end - start > max_span:
+            requests.append((start, start + max_span))
+            start += max_span
+        requests.append((start, end))
+    return requests
+
+
+def merge(
+    series: np.ndarray,
+    ranges: list[Range],
+    fetched: list[np.ndarray],
+    gaps: list[Range],
+) -> tuple[np.ndarray, list[Range]]:
+    """Merge fetched candles into a series. Incomplete candles are not
+    cached, and coverage stops at the first incomplete candle or now."""
+    candles = np.concatenate([series, *fetched])
+    cutoff = to_datetime64(datetime.now(UTC))
+    incomplete = candles["time"][~candles["complete"]]
+    if len(incomplete):
+        cutoff = min(cutoff, incomplete.min())
+        candles = candles[candles["time"] < cutoff]
+    gaps = [(s, min(e, cutoff)) for s, e in gaps if s < cutoff]
+
+    # keep the latest version of each candle, ordered by time
+    _, index = np.unique(candles["time"][::-1], return_index=True)
+    candles = candles[::-1][index]
+    return candles, union(ranges + gaps)
+
+
+candle_store = CandleStore()
@@ -1,15 +1,88 @@
 """OANDA API models."""
 
-__all__ = ["Account", "Trade", "Trades", "Order", "Orders"]
+__all__ = [
+    "Account",
+    "TradeState",
+    "TradeStateFilter",
+    "Trade",
+    "Trades",
+    "Order",
+    "Orders",
+    "AccountChanges",
+    "Transaction",
+    "OrderFill",
+    "Transactions",
+    "Granularity",
+    "Candle",
+    "Candles",
+    "LazyList",
+]
 
-from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Iterator, Sequence, get_args, overload
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, GetCoreSchemaHandler
+from pydantic_core import core_schema
 from pydantic_extra_types.currency_code import Currency
 
+from app.core.timeseries import CANDLE_DTYPE, to_datetime64
+from app.journal import models as journal
+
 from .settings import oanda_settings
 
 
+class LazyList[T: BaseModel](Sequence[T]):
+    """List of models that are validated when first accessed. Unvalidated
+    items are kept as the raw JSON values they were decoded to."""
+
+    def __init__(self, model: type[T], items: list[Any]) -> None:
+        self.model = model
+        self._items = items
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+
+        item = self._items[index]
+        if not isinstance(item, self.model):
+            item = self._items[index] = self.model.model_validate(item)
+        return item
+
+    def __iter__(self) -> Iterator[T]:
+        return (self[i] for i in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        (model,) = get_args(source)
+        return core_schema.no_info_after_validator_function(
+            lambda items: cls(model, items),
+            core_schema.list_schema(core_schema.any_schema()),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda items: list(items),
+                return_schema=core_schema.list_schema(handler(model)),
+            ),
+        )
+
+
 class Account(BaseModel):
-    model_config = ConfigDict(extra="allow")
+    model_config = ConfigDict(extra="ignore")
 
     id: str = Field()
     name: str = Field(alias="alias")
@@ -39,9 +112,90 @@ class Account(BaseModel):
         )
 
 
+class TradeState(str, Enum):
+    """OANDA trade state."""
+
+    OPEN = "OPEN"
+    CLOSED = "CLOSED"
+    CLOSE_WHEN_TRADEABLE = "CLOSE_WHEN_TRADEABLE"
+
+
+class TradeStateFilter(str, Enum):
+    """OANDA trade state filter."""
+
+    OPEN = "OPEN"
+    CLOSED = "CLOSED"
+    CLOSE_WHEN_TRADEABLE = "CLOSE_WHEN_TRADEABLE"
+    ALL = "ALL"
+
+
+class Order(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field()
+    price: float | None = Field(None)
+
+    @classmethod
+    def path(cls, id: str) -> str:
+        return f"{Account.path()}/orders/{id}"
+
+
 class Trade(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field()
+    instrument: str = Field()
+    price: float = Field()
+    open_time: datetime = Field(alias="openTime")
+    state: TradeState = Field()
+
+    initial_units: float = Field(alias="initialUnits")
+    current_units: float = Field(alias="currentUnits")
+    realized_pl: float = Field(alias="realizedPL")
+    unrealized_pl: float | None = Field(None, alias="unrealizedPL")
+    financing: float | None = Field(None)
+
+    average_close_price: float | None = Field(None, alias="averageClosePrice")
+    close_time: datetime | None = Field(None, alias="closeTime")
+
+    stop_loss_order: Order | None = Field(None, alias="stopLossOrder")
+    take_profit_order: Order | None = Field(None, alias="takeProfitOrder")
+
+    @property
+    def entry(self) -> journal.TradeEntry:
+        """The journal entry of the trade."""
+        return journal.TradeEntry(
+            trade_id=self.id,
+            symbol=self.instrument,
+            entry_timestamp=self.open_time,
+            entry_price=self.price,
+            quantity=abs(self.initial_units),
+            direction=(
+                journal.TradeDirection.LONG
+                if self.initial_units > 0
+                else journal.TradeDirection.SHORT
+            ),
+            stop_loss=(
+                self.stop_loss_order.price if self.stop_loss_order else None
+            ),
+            take_profit=(
+                self.take_profit_order.price
+                if self.take_profit_order
+                else None
+            ),
+            is_filled=True,
+        )
+
+    @property
+    def exit(self) -> journal.TradeExit | None:
+        """The journal exit of the trade, if it is closed."""
+        if self.close_time is None or self.average_close_price is None:
+            return None
+        return journal.TradeExit(
+            trade_id=self.id,
+            exit_timestamp=self.close_time,
+            exit_price=self.average_close_price,
+            fees=-(self.financing or 0.0),  # negative financing is a cost
+            realized_pl=self.realized_pl,
+        )
 
     @classmethod
     def path(cls, id: str) -> str:
@@ -49,27 +203,214 @@ class Trade(BaseModel):
 
 
 class Trades(BaseModel):
-    model_config = ConfigDict(extra="allow")
-    trades: list[Trade]
+    model_config = ConfigDict(extra="ignore")
+    trades: LazyList[Trade]
+    last_transaction_id: str | None = Field(None, alias="lastTransactionID")
 
     @classmethod
     def path(cls) -> str:
         return f"{Account.path()}/trades"
 
 
-class Order(BaseModel):
-    model_config = ConfigDict(extra="allow")
-    id: str = Field()
+class Orders(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    orders: list[Order]
 
     @classmethod
-    def path(cls, id: str) -> str:
-        return f"{Account.path()}/orders/{id}"
+    def path(cls) -> str:
+        return f"{Account.path()}/orders"
 
 
-class Orders(BaseModel):
-    model_config = ConfigDict(extra="allow")
-    orders: list[Order]
+class Changes(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    trades_opened: list[Trade] = Field([], alias="tradesOpened")
+    trades_reduced: list[Trade] = Field([], alias="tradesReduced")
+    trades_closed: list[Trade] = Field([], alias="tradesClosed")
+
+    @property
+    def trades(self) -> list[Trade]:
+        """The changed trades, in the order they should be applied."""
+        return self.trades_opened + self.trades_reduced + self.trades_closed
+
+
+class AccountChanges(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    changes: Changes
+    last_transaction_id: str = Field(alias="lastTransactionID")
 
     @classmethod
     def path(cls) -> str:
-        return f"{Account.path()}/orders"
+        return f"{Account.path()}/changes"
+
+
+class Transaction(BaseModel):
+    """A transaction, or a heartbeat of the transaction stream."""
+
+    model_config = ConfigDict(extra="ignore")
+    type: str = Field()
+    id: str | None = Field(None)
+    time: datetime = Field()
+    last_transaction_id: str | None = Field(None, alias="lastTransactionID")
+
+    @classmethod
+    def stream_path(cls) -> str:
+        return (
+            f"{oanda_settings.stream_url}/accounts/"
+            f"{oanda_settings.ACCOUNT_ID}/transactions/stream"
+        )
+
+
+class TradeOpen(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    trade_id: str = Field(alias="tradeID")
+    units: float = Field()
+    price: float = Field()
+
+
+class TradeReduce(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    trade_id: str = Field(alias="tradeID")
+    units: float = Field()
+    price: float = Field()
+    realized_pl: float = Field(alias="realizedPL")
+    financing: float = Field(0.0)
+
+
+class OrderFill(Transaction):
+    """An order fill, opening, reducing or closing trades."""
+
+    instrument: str = Field()
+    trade_opened: TradeOpen | None = Field(None, alias="tradeOpened")
+    trade_reduced: TradeReduce | None = Field(None, alias="tradeReduced")
+    trades_closed: list[TradeReduce] = Field([], alias="tradesClosed")
+
+    @property
+    def entry(self) -> journal.TradeEntry | None:
+        """The journal entry of the opened trade, if any."""
+        if not (opened := self.trade_opened):
+            return None
+        return journal.TradeEntry(
+            trade_id=opened.trade_id,
+            symbol=self.instrument,
+            entry_timestamp=self.time,
+            entry_price=opened.price,
+            quantity=abs(opened.units),
+            direction=(
+                journal.TradeDirection.LONG
+                if opened.units > 0
+                else journal.TradeDirection.SHORT
+            ),
+            is_filled=True,
+        )
+
+    @property
+    def exits(self) -> list[journal.TradeExit]:
+        """The journal exits of the closed trades, covering this fill only.
+        Partially reduced trades are not exited."""
+        return [
+            journal.TradeExit(
+                trade_id=closed.trade_id,
+                exit_timestamp=self.time,
+                exit_price=closed.price,
+                fees=-closed.financing,  # negative financing is a cost
+                realized_pl=closed.realized_pl,
+            )
+            for closed in self.trades_closed
+        ]
+
+
+class Transactions(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    transactions: list[dict[str, Any]]
+    last_transaction_id: str = Field(alias="lastTransactionID")
+
+    @classmethod
+    def path(cls) -> str:
+        return f"{Account.path()}/transactions/sinceid"
+
+
+class Granularity(str, Enum):
+    """OANDA candlestick granularity."""
+
+    S5 = "S5"
+    S10 = "S10"
+    S15 = "S15"
+    S30 = "S30"
+    M1 = "M1"
+    M2 = "M2"
+    M4 = "M4"
+    M5 = "M5"
+    M10 = "M10"
+    M15 = "M15"
+    M30 = "M30"
+    H1 = "H1"
+    H2 = "H2"
+    H3 = "H3"
+    H4 = "H4"
+    H6 = "H6"
+    H8 = "H8"
+    H12 = "H12"
+    D = "D"
+    W = "W"
+
+    @property
+    def duration(self) -> timedelta:
+        """The duration of a candle."""
+        if self == Granularity.D:
+            return timedelta(days=1)
+        if self == Granularity.W:
+            return timedelta(weeks=1)
+        unit = {"S": "seconds", "M": "minutes", "H": "hours"}[self.value[0]]
+        return timedelta(**{unit: int(self.value[1:])})
+
+    @classmethod
+    def from_timedelta(cls, duration: timedelta) -> "Granularity":
+        """The granularity of candles of a duration."""
+        for granularity in cls:
+            if granularity.duration == duration:
+                return granularity
+        raise ValueError(f"Unsupported candle duration: {duration}")
+
+
+class CandleData(BaseModel):
+    o: float = Field()
+    h: float = Field()
+    l: float = Field()
+    c: float = Field()
+
+
+class Candle(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    time: datetime = Field()
+    volume: int = Field()
+    complete: bool = Field()
+    mid: CandleData = Field()
+
+
+class Candles(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    instrument: str = Field()
+    granularity: Granularity = Field()
+    candles: list[Candle]
+
+    def to_array(self) -> np.ndarray:
+        """The candles as a `CANDLE_DTYPE` array."""
+        return np.array(
+            [
+                (
+                    to_datetime64(c.time),
+                    c.mid.o,
+                    c.mid.h,
+                    c.mid.l,
+                    c.mid.c,
+                    c.volume,
+                    c.complete,
+                )
+                for c in self.candles
+            ],
+            dtype=CANDLE_DTYPE,
+        )
+
+    @classmethod
+    def path(cls, instrument: str) -> str:
+        return f"{oanda_settings.base_url}/instruments/{instrument}/candles"
@@ -0,0 +1,146 @@
+"""OANDA API request scheduling."""
+
+__all__ = ["TokenBucket", "SchedulerStats", "Scheduler"]
+
+import random
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Callable
+
+import requests
+
+from .settings import oanda_settings
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+"""Response statuses of requests that can be retried."""
+MAX_BACKOFF = 30.0
+"""Maximum delay between retries, in seconds."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter. Tokens are reserved up front,
+    so concurrent callers are spaced out instead of waking up together."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = Lock()
+
+    def acquire(self) -> float:
+        """Take a token, waiting for one if needed. Returns the wait time."""
+        with self._lock:
+            now = self.clock()
+            elapsed = (now - self._updated) * self.rate
+            self.tokens = min(self.capacity, self.tokens + elapsed) - 1
+            self._updated = now
+            wait = max(0.0, -self.tokens / self.rate)
+
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+@dataclass
+class SchedulerStats:
+    """Request scheduler counters."""
+
+    requests: int = 0
+    """Requests sent, including retries."""
+    throttled: int = 0
+    """Requests delayed by the rate limit or rejected with a 429."""
+    retried: int = 0
+    """Requests retried after a failure."""
+    failed: int = 0
+    """Requests that failed after all retries."""
+
+
+class Scheduler:
+    """Rate-limited request scheduler. Idempotent requests that fail with a
+    retryable status or a connection error are retried with jittered
+    exponential backoff, honoring the server's `Retry-After` header."""
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        max_retries: int | None = None,
+        backoff: float | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.bucket = TokenBucket(
+            rate or oanda_settings.RATE_LIMIT, sleep=sleep
+        )
+        self.max_retries = (
+            oanda_settings.MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff = backoff or oanda_settings.RETRY_BACKOFF
+        self.sleep = sleep
+        self.stats = SchedulerStats()
+        self._lock = Lock()
+
+    def send(
+        self,
+        request: Callable[[], requests.Response],
+        idempotent: bool = True,
+    ) -> requests.Response:
+        """Send a request, retrying it if it is idempotent."""
+        attempt = 0
+        while True:
+            if self.bucket.acquire() > 0:
+                self.count("throttled")
+            self.count("requests")
+            retry = idempotent and attempt < self.max_retries
+
+            try:
+                response = request()
+            except (requests.ConnectionError, requests.Timeout):
+                if not retry:
+                    self.count("failed")
+                    raise
+                delay = self.delay(attempt)
+            else:
+                if response.status_code == 429:
+                    self.count("throttled")
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                if not retry:
+                    self.count("failed")
+                    return response
+                delay = retry_after(response) or self.delay(attempt)
+
+            self.count("retried")
+            self.sleep(delay)
+            attempt += 1
+
+    def delay(self, attempt: int) -> float:
+        """The backoff delay of a retry, with full jitter."""
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff * 2**attempt))
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self.stats, counter, getattr(self.stats, counter) + 1)
+
+
+def retry_after(response: requests.Response) -> float | None:
+    """The delay requested by a response's `Retry-After` header."""
+    if not (value := response.headers.get("Retry-After")):
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (date - datetime.now(UTC)).total_seconds())
@@ -26,6 +26,18 @@ class OANDASettings(core.Settings):
     API_KEY: str = ""
     ACCOUNT_ID: str = ""
     ENVIRONMENT: OANDAEnvironment = OANDAEnvironment.PRACTICE
+    API_URL: str = ""
+    POOL_SIZE: int = 10
+    REQUEST_TIMEOUT: float = 10.0
+    MAX_CONCURRENCY: int = 10
+    PAGE_SIZE: int = 500
+    RATE_LIMIT: float = 100.0
+    MAX_RETRIES: int = 3
+    RETRY_BACKOFF: float = 0.5
+    ACCOUNT_CACHE_TTL: float = 30.0
+    TRADES_CACHE_TTL: float = 60.0
+    HEARTBEAT_TIMEOUT: float = 15.0
+    MAX_RECONNECT_DELAY: float = 30.0
 
     settings_exclude = {"APP_NAME"}
     model_config = SettingsConfigDict(
@@ -35,7 +47,10 @@ class OANDASettings(core.Settings):
     @computed_field
     @property
     def base_url(self) -> str:
-        """Return the base URL for the OANDA environment."""
+        """Return the base URL for the OANDA environment, unless overridden
+        by `API_URL`, such as by a local stand-in server."""
+        if self.API_URL:
+            return self.API_URL.rstrip("/")
         url = (
             "api-fxpractice.oanda.com"
             if self.ENVIRONMENT == OANDAEnvironment.PRACTICE
@@ -43,6 +58,20 @@ class OANDASettings(core.Settings):
         )
         return f"https://{url}/v3"
 
+    @computed_field
+    @property
+    def stream_url(self) -> str:
+        """Return the streaming URL for the OANDA environment, unless
+        overridden by `API_URL`."""
+        if self.API_URL:
+            return self.API_URL.rstrip("/")
+        url = (
+            "stream-fxpractice.oanda.com"
+            if self.ENVIRONMENT == OANDAEnvironment.PRACTICE
+            else "stream-fxtrade.oanda.com"
+        )
+        return f"https://{url}/v3"
+
     @computed_field
     @property
     def request_headers(self) -> dict[str, str]:
@@ -50,6 +79,8 @@ class OANDASettings(core.Settings):
         return {
             "Authorization": f"Bearer {self.API_KEY}",
             "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
         }
 
     @field_validator("API_KEY")
@@ -65,4 +96,4 @@ class OANDASettings(core.Settings):
         return key
 
 
-oanda_settings = OANDASettings()
+oanda_settings = OANDASettings.load()
@@ -0,0 +1,135 @@
+"""OANDA transaction stream client."""
+
+__all__ = ["TransactionStream", "stream_trades"]
+
+import logging
+import time
+from pathlib import Path
+from typing import Iterator
+
+import requests
+
+from app.journal import models as journal
+
+from . import api, models
+from .settings import oanda_settings
+from .sync import SyncState
+from .transport import decode, transport
+
+logger = logging.getLogger(__name__)
+
+FILL = "ORDER_FILL"
+HEARTBEAT = "HEARTBEAT"
+
+
+class StreamState(SyncState):
+    """The last transaction journaled from the stream."""
+
+    @classmethod
+    def path(cls) -> Path:
+        return SyncState.path().with_suffix(".stream.json")
+
+
+class TransactionStream:
+    """Transactions of the account as they happen, read from a long-lived
+    connection. The stream reconnects when it drops or misses heartbeats,
+    and transactions missed in between are backfilled. Heartbeats are not
+    yielded."""
+
+    def __init__(
+        self,
+        since_id: str | None = None,
+        heartbeat_timeout: float | None = None,
+        backoff: float | None = None,
+    ) -> None:
+        self.last_id = since_id
+        """The ID of the last transaction yielded."""
+        self.heartbeat_timeout = (
+            heartbeat_timeout or oanda_settings.HEARTBEAT_TIMEOUT
+        )
+        self.backoff = backoff or oanda_settings.RETRY_BACKOFF
+        self.last_heartbeat: float | None = None
+        self.received = 0
+        """The number of lines received from the stream."""
+
+    def __iter__(self) -> Iterator[models.Transaction]:
+        delay = self.backoff
+        while True:
+            received = self.received
+            try:
+                if self.last_id is not None:
+                    yield from self.backfill()
+                yield from self.read()
+                logger.debug("Transaction stream closed.")
+            except requests.RequestException as error:
+                logger.warning(f"Transaction stream failed: {error!r}")
+
+            if self.received > received:  # was connected, reconnect now
+                delay = self.backoff
+                continue
+            logger.debug(f"Reconnecting to the stream in {delay:.1f}s.")
+            time.sleep(delay)
+            delay = min(delay * 2, oanda_settings.MAX_RECONNECT_DELAY)
+
+    def read(self) -> Iterator[models.Transaction]:
+        """Read the transactions of a stream connection, parsing each line
+        as it arrives. Fails if no heartbeat arrives within the timeout."""
+        with transport.session.get(
+            models.Transaction.stream_path(),
+            stream=True,
+            timeout=(oanda_settings.REQUEST_TIMEOUT, self.heartbeat_timeout),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(chunk_size=None):
+                self.received += 1
+                if line and (transaction := self.accept(line)):
+                    yield transaction
+
+    def backfill(self) -> Iterator[models.Transaction]:
+        """Read the transactions since the last one yielded."""
+        response = transport.get(
+            models.Transactions.path(), params={"id": self.last_id}
+        )
+        for payload in decode(response, models.Transactions).transactions:
+            if transaction := self.accept(payload):
+                yield transaction
+
+    def accept(self, line: bytes | dict) -> models.Transaction | None:
+        """Parse a transaction, returning it if it was not yielded before.
+        Order fills are parsed fully."""
+        if isinstance(line, bytes):
+            transaction = decode(line, models.Transaction)
+        else:
+            transaction = models.Transaction.model_validate(line)
+        if transaction.type == HEARTBEAT:
+            self.last_heartbeat = time.monotonic()
+            if self.last_id is None:  # backfilled from it on reconnection
+                self.last_id = transaction.last_transaction_id
+            return None
+        if self.last_id and int(transaction.id or 0) <= int(self.last_id):
+            return None  # backfilled before the stream caught up
+
+        self.last_id = transaction.id
+        if transaction.type != FILL:
+            return transaction
+        if isinstance(line, bytes):
+            return decode(line, models.OrderFill)
+        return models.OrderFill.model_validate(line)
+
+
+def stream_trades(
+    since_id: str | None = None,
+) -> Iterator[journal.TradeEntry | journal.TradeExit]:
+    """Journal records of the account's trades as they are filled and
+    closed, from the transaction stream. Transactions after `since_id`, or
+    after the last journaled transaction, are backfilled first. Exits are
+    retrieved from the closed trade's details, covering its reductions."""
+    since_id = since_id or StreamState.load().last_transaction_id
+    for transaction in TransactionStream(since_id):
+        if isinstance(transaction, models.OrderFill):
+            if entry := transaction.entry:
+                yield entry
+            for exit in transaction.exits:
+                yield api.get_trade(exit.trade_id).exit or exit
+        # resumed once the consumer journaled the transaction's records
+        StreamState(lastTransactionID=transaction.id).save()
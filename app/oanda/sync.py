@@ -0,0 +1,71 @@
+"""OANDA incremental trade synchronization."""
+
+__all__ = ["sync_trades", "save_sync"]
+
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app import core
+
+from . import api, models
+from .settings import oanda_settings
+
+
+class SyncState(BaseModel):
+    """The last transaction the journal is synchronized to."""
+
+    model_config = ConfigDict(extra="ignore")
+    last_transaction_id: str | None = Field(None, alias="lastTransactionID")
+
+    @classmethod
+    def path(cls) -> Path:
+        return (
+            core.global_settings.data_path
+            / oanda_settings.APP_NAME
+            / f"{oanda_settings.ACCOUNT_ID}.json"
+        )
+
+    @classmethod
+    def load(cls) -> "SyncState":
+        """Load the stored state, or an empty state if there is none."""
+        if not cls.path().exists():
+            return cls()
+        return cls.model_validate_json(cls.path().read_bytes())
+
+    def save(self) -> None:
+        """Store the state atomically."""
+        path = self.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(".tmp")
+        temp.write_text(self.model_dump_json(by_alias=True))
+        temp.replace(path)
+
+
+def sync_trades(full: bool = False) -> models.Trades:
+    """Retrieves the account trades changed since the last synchronization,
+    or all of them if `full` is set or there is no local state. The
+    synchronization is recorded with `save_sync` once the trades are
+    stored."""
+    state = SyncState() if full else SyncState.load()
+
+    if state.last_transaction_id is None:
+        # later changes are picked up by the next sync
+        last_transaction_id = api.get_account().last_transaction_id
+        trades = list(api.iter_trades(models.TradeStateFilter.ALL))
+    else:
+        changes = api.get_changes(state.last_transaction_id)
+        last_transaction_id = changes.last_transaction_id
+        trades = list(
+            {trade.id: trade for trade in changes.changes.trades}.values()
+        )
+
+    return models.Trades(
+        trades=sorted(trades, key=lambda t: int(t.id)),
+        lastTransactionID=last_transaction_id,
+    )
+
+
+def save_sync(last_transaction_id: str) -> None:
+    """Records the last transaction the journal is synchronized to."""
+    SyncState(lastTransactionID=last_transaction_id).save()
@@ -0,0 +1,159 @@
+"""OANDA API transport."""
+
+__all__ = ["Transport", "transport", "decode"]
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
+from threading import Lock
+from typing import Any
+
+import requests
+from pydantic import BaseModel, ConfigDict, create_model
+from requests.adapters import HTTPAdapter
+
+from app import core
+
+from .scheduler import Scheduler
+from .settings import oanda_settings
+
+transport: "Transport"
+"""Shared OANDA API transport."""
+
+logger = logging.getLogger(__name__)
+
+
+class Transport:
+    """Pooled, keep-alive HTTP transport for the OANDA API."""
+
+    def __init__(
+        self,
+        pool_size: int | None = None,
+        timeout: float | None = None,
+        max_concurrency: int | None = None,
+    ) -> None:
+        self.pool_size = pool_size or oanda_settings.POOL_SIZE
+        self.timeout = timeout or oanda_settings.REQUEST_TIMEOUT
+        self.max_concurrency = (
+            max_concurrency or oanda_settings.MAX_CONCURRENCY
+        )
+        self.scheduler = Scheduler()
+        self._session: requests.Session | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """The pooled HTTP session, created on first use."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """The worker pool bounding concurrent async requests."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_concurrency, thread_name_prefix="oanda"
+                    )
+        return self._executor
+
+    def get(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> requests.Response:
+        """Send a GET request through the pooled session. The request is
+        rate-limited, and retried on throttling and transient failures."""
+        start = time.perf_counter()
+        with core.span("http"):
+            response = self.scheduler.send(
+                lambda: self.session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=timeout or self.timeout,
+                )
+            )
+        duration = time.perf_counter() - start
+        logger.debug(
+            f"GET {url}: {response.status_code} in {duration:.3f}s.",
+            extra={
+                "url": url,
+                "status": response.status_code,
+                "duration": duration,
+            },
+        )
+        response.raise_for_status()
+        return response
+
+    async def aget(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> requests.Response:
+        """Send a GET request without blocking the event loop.
+        At most `max_concurrency` requests are in flight at once."""
+        loop = asyncio.get_running_loop()
+        request = partial(self.get, url, params=params, timeout=timeout)
+        return await loop.run_in_executor(self.executor, request)
+
+    def close(self) -> None:
+        """Close the session and its pooled connections."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            if self._session is not None:
+                self._session.close()
+            self._executor = None
+            self._session = None
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(oanda_settings.request_headers)
+
+        pool_size = max(self.pool_size, self.max_concurrency)
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+
+def decode[M: BaseModel](
+    response: requests.Response | bytes,
+    model: type[M],
+    key: str | None = None,
+) -> M:
+    """Validate a response body into a model straight from its bytes. If
+    `key` is set, the model is read from that key of the body."""
+    if not isinstance(response, bytes):
+        response = response.content
+    with core.span("validation"):
+        if key is None:
+            return model.model_validate_json(response)
+        body = envelope(model, key).model_validate_json(response)
+    return getattr(body, key)
+
+
+@cache
+def envelope(model: type[BaseModel], key: str) -> type[BaseModel]:
+    """The model of a response body holding a model in a key."""
+    return create_model(
+        f"{model.__name__}Response",
+        __config__=ConfigDict(extra="ignore"),
+        **{key: model},
+    )
+
+
+transport = Transport()
@@ -15,6 +15,8 @@ app_settings: "AppSettings"
 
 class AppSettings(core.Settings):
     DEBUG_MODE: bool = False
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_DROP_POLICY: core.DropPolicy = core.DropPolicy.BLOCK
 
     @computed_field
     @property
@@ -41,5 +43,10 @@ class AppSettings(core.Settings):
     def logging_path(self) -> Path:
         return global_settings.logging_path
 
+    @computed_field
+    @property
+    def profiling_path(self) -> Path:
+        return global_settings.profiling_path
+
 
-app_settings = AppSettings()
+app_settings = AppSettings.load()
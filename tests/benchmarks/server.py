@@ -0,0 +1,101 @@
+"""Local stand-in of the OANDA v3 API, serving synthetic accounts."""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from .synthetic import ACCOUNT_ID, Synthetic
+
+DEFAULT_COUNT = 50
+"""Trades returned per request when no count is set, as by OANDA."""
+ROUTE = re.compile(r"^/v3/accounts/(?P<id>[^/]+)(?P<resource>/\w+)?$")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """OANDA stand-in, serving a synthetic account of `trades` trades.
+    Responses are delayed by `latency` seconds. Trades are generated as
+    they are requested, so that large accounts are never held in memory."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, trades: int, latency: float = 0.0, seed: int = 0
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.trades = trades
+        self.synthetic = Synthetic(trades, seed)
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        """The base URL of the stand-in API."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def __enter__(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        super().__exit__(*args)
+
+    def account(self) -> dict:
+        """The account payload."""
+        return self.synthetic.account()
+
+    def page(self, state: str, count: int, before: int | None) -> dict:
+        """A page of trades in a state, newest first, up to a trade ID. The
+        ID is inclusive, as in the OANDA API."""
+        end = before + 1 if before is not None else None
+        ids = islice(self.synthetic.select(state, end), count)
+        trades = [self.synthetic.payload(id) for id in ids]
+        return {"trades": trades, "lastTransactionID": str(self.trades)}
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Stand-in request handler."""
+
+    server: StandInServer
+    protocol_version = "HTTP/1.1"  # keeps pooled connections alive
+
+    def do_GET(self) -> None:
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        match = ROUTE.match(url.path)
+        if not match or match["id"] != ACCOUNT_ID:
+            return self.reply(404, {"errorMessage": "Not found."})
+        if not match["resource"]:
+            return self.reply(200, self.server.account())
+        if match["resource"] == "/orders":
+            return self.reply(200, {"orders": []})
+        if match["resource"] != "/trades":
+            return self.reply(404, {"errorMessage": "Not found."})
+
+        before = query.get("beforeID")
+        body = self.server.page(
+            query.get("state", "OPEN"),
+            int(query.get("count", DEFAULT_COUNT)),
+            int(before) if before else None,
+        )
+        self.reply(200, body)
+
+    def reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_: Any) -> None:
+        pass  # requests are not logged
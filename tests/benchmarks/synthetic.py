@@ -0,0 +1,273 @@
+"""Seeded synthetic trade histories, as journal trades and matching OANDA
+payloads. Each trade is generated from its ID and the seed alone, so that
+trades are streamed or served in any order without holding the history in
+memory."""
+
+import json
+import random
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import IO, Iterator
+
+from app.journal.models import (
+    Indicators,
+    Trade,
+    TradeDirection,
+    TradeEntry,
+    TradeExit,
+)
+
+ACCOUNT_ID = "101-001-0000000-001"
+SYMBOLS = {
+    "EUR_USD": (1.1, 5),
+    "GBP_USD": (1.27, 5),
+    "USD_JPY": (148.0, 3),
+    "AUD_USD": (0.66, 5),
+    "USD_CAD": (1.36, 5),
+    "XAU_USD": (2000.0, 2),
+}
+"""Traded symbols, as their base price and price precision."""
+DIRECTIONS = list(TradeDirection)
+UNITS = [1_000, 2_000, 5_000, 10_000, 25_000, 100_000]
+TIMEFRAMES = [timedelta(minutes=15), timedelta(hours=1), timedelta(days=1)]
+"""Timeframes indicators are generated for."""
+START = datetime(2015, 1, 1, tzinfo=UTC)
+SPACING = 600
+"""Average seconds between trade entries."""
+OPEN_WINDOW = 0.05
+"""Share of the most recent trades which may still be open."""
+OPEN_RATE = 0.5
+"""Probability of a trade in the open window being open."""
+PARTIAL_RATE = 0.3
+"""Probability of an open trade being partially closed."""
+
+
+@dataclass(frozen=True, slots=True)
+class Sample:
+    """The generated fields of a trade."""
+
+    id: int
+    symbol: str
+    digits: int
+    direction: TradeDirection
+    units: int
+    closed_units: int
+    entry_time: datetime
+    entry_price: float
+    stop_loss: float | None
+    take_profit: float | None
+    exit_time: datetime | None
+    exit_price: float | None
+    realized_pl: float
+    financing: float
+
+    @property
+    def is_open(self) -> bool:
+        return self.exit_time is None
+
+
+class Synthetic:
+    """Synthetic account of `count` trades, with IDs from 1 to `count` in
+    entry order. The most recent trades may be open, some of which are
+    partially closed."""
+
+    def __init__(self, count: int, seed: int = 0) -> None:
+        self.count = count
+        self.seed = seed
+
+    def sample(self, id: int) -> Sample:
+        """The generated fields of a trade."""
+        rng = self.random(id)
+        symbol = rng.choice(list(SYMBOLS))
+        base, digits = SYMBOLS[symbol]
+        pip = 10 ** -(digits - 1)
+        direction = rng.choice(DIRECTIONS)
+        sign = 1 if direction == TradeDirection.LONG else -1
+        units = rng.choice(UNITS) // (100 if symbol == "XAU_USD" else 1)
+
+        entry_time = START + timedelta(
+            seconds=id * SPACING + rng.randrange(SPACING)
+        )
+        entry_price = round(base * (1 + rng.gauss(0, 0.05)), digits)
+        stop_loss = take_profit = None
+        if rng.random() < 0.8:
+            stop_loss = round(
+                entry_price - sign * rng.randint(10, 50) * pip, digits
+            )
+        if rng.random() < 0.6:
+            take_profit = round(
+                entry_price + sign * rng.randint(10, 100) * pip, digits
+            )
+
+        is_open = id > self.open_window and rng.random() < OPEN_RATE
+        closed_units = units
+        if is_open:  # partially closed, or not at all
+            closed_units = (
+                units // rng.choice([2, 4, 5])
+                if rng.random() < PARTIAL_RATE
+                else 0
+            )
+        move = rng.gauss(0, 30) * pip
+        exit_price = round(entry_price + move, digits)
+        realized_pl = round(sign * move * closed_units, 4)
+        financing = round(-rng.uniform(0, 2) * units / 10_000, 4)
+
+        return Sample(
+            id=id,
+            symbol=symbol,
+            digits=digits,
+            direction=direction,
+            units=units,
+            closed_units=closed_units,
+            entry_time=entry_time,
+            entry_price=entry_price,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            exit_time=(
+                None
+                if is_open
+                else entry_time + timedelta(seconds=rng.randint(60, 259_200))
+            ),
+            exit_price=None if is_open else exit_price,
+            realized_pl=realized_pl,
+            financing=financing,
+        )
+
+    def indicators(self, sample: Sample) -> dict[timedelta, Indicators]:
+        """The indicators at a trade's entry. They are only part of journal
+        trades, and are generated separately from the other fields."""
+        rng = self.random(sample.id, stream=1)
+        pip = 10 ** -(sample.digits - 1)
+        return {
+            timeframe: Indicators(
+                ema=round(
+                    sample.entry_price * (1 + rng.gauss(0, 0.002)),
+                    sample.digits,
+                ),
+                stochastic=round(rng.uniform(0, 100), 2),
+                rsi=round(rng.uniform(0, 100), 2),
+                macd=round(rng.gauss(0, 10 * pip), sample.digits + 1),
+            )
+            for timeframe in TIMEFRAMES
+        }
+
+    def random(self, id: int, stream: int = 0) -> random.Random:
+        """The random generator of a trade's fields."""
+        return random.Random((self.seed << 32 | id) << 1 | stream)
+
+    @property
+    def open_window(self) -> int:
+        """The ID after which trades may be open."""
+        return int(self.count * (1 - OPEN_WINDOW))
+
+    def is_open(self, id: int) -> bool:
+        """Whether a trade is open."""
+        return self.sample(id).is_open
+
+    def trade(self, id: int) -> Trade:
+        """The journal trade of an ID."""
+        sample = self.sample(id)
+        entry = TradeEntry(
+            trade_id=str(id),
+            symbol=sample.symbol,
+            entry_timestamp=sample.entry_time,
+            entry_price=sample.entry_price,
+            quantity=sample.units,
+            direction=sample.direction,
+            stop_loss=sample.stop_loss,
+            take_profit=sample.take_profit,
+            indicators=self.indicators(sample),
+            is_filled=True,
+        )
+        if sample.exit_time is None or sample.exit_price is None:
+            return Trade(entry=entry)
+        exit = TradeExit(
+            trade_id=str(id),
+            exit_timestamp=sample.exit_time,
+            exit_price=sample.exit_price,
+            fees=-sample.financing,
+            realized_pl=sample.realized_pl,
+        )
+        return Trade(entry=entry, exit=exit)
+
+    def payload(self, id: int) -> dict:
+        """The OANDA trade payload of an ID."""
+        sample = self.sample(id)
+        sign = 1 if sample.direction == TradeDirection.LONG else -1
+        payload = {
+            "id": str(id),
+            "instrument": sample.symbol,
+            "price": str(sample.entry_price),
+            "openTime": timestamp(sample.entry_time),
+            "state": "OPEN" if sample.is_open else "CLOSED",
+            "initialUnits": str(sign * sample.units),
+            "currentUnits": str(sign * (sample.units - sample.closed_units)),
+            "realizedPL": f"{sample.realized_pl:.4f}",
+            "financing": f"{sample.financing:.4f}",
+        }
+        if sample.stop_loss is not None:
+            payload["stopLossOrder"] = order(f"{id}-sl", sample.stop_loss)
+        if sample.take_profit is not None:
+            payload["takeProfitOrder"] = order(f"{id}-tp", sample.take_profit)
+        if sample.exit_time is not None and sample.exit_price is not None:
+            payload["closeTime"] = timestamp(sample.exit_time)
+            payload["averageClosePrice"] = str(sample.exit_price)
+        return payload
+
+    def select(self, state: str, before: int | None = None) -> Iterator[int]:
+        """The IDs of the trades in an OANDA state filter, newest first,
+        before an ID."""
+        end = min(before or self.count + 1, self.count + 1)
+        first = self.open_window if state == "OPEN" else 0
+        for id in range(end - 1, first, -1):
+            if state == "ALL" or (state == "OPEN") == self.is_open(id):
+                yield id
+
+    def trades(self) -> Iterator[Trade]:
+        """The journal trades, in entry order."""
+        return map(self.trade, range(1, self.count + 1))
+
+    def payloads(self, state: str = "ALL") -> Iterator[dict]:
+        """The OANDA trade payloads in a state filter, newest first."""
+        return map(self.payload, self.select(state))
+
+    def account(self) -> dict:
+        """The OANDA account payload."""
+        open_ids = list(self.select("OPEN"))
+        symbols = {self.sample(id).symbol for id in open_ids}
+        return {
+            "account": {
+                "id": ACCOUNT_ID,
+                "alias": "Synthetic",
+                "lastTransactionID": str(self.count),
+                "currency": "USD",
+                "commission": "0.0000",
+                "balance": "100000.0000",
+                "NAV": "100250.0000",
+                "pl": "1250.0000",
+                "unrealizedPL": "250.0000",
+                "marginUsed": "2500.0000",
+                "marginAvailable": "97750.0000",
+                "marginRate": "0.02",
+                "openTradeCount": len(open_ids),
+                "openPositionCount": len(symbols),
+                "pendingOrderCount": 0,
+            },
+            "lastTransactionID": str(self.count),
+        }
+
+    def dump(self, file: IO[str], state: str = "ALL") -> None:
+        """Write an OANDA trades payload, one trade at a time."""
+        file.write('{"trades": [')
+        for index, payload in enumerate(self.payloads(state)):
+            file.write(("," if index else "") + json.dumps(payload))
+        file.write(f'], "lastTransactionID": "{self.count}"}}')
+
+
+def order(id: str, price: float) -> dict:
+    return {"id": id, "price": str(price)}
+
+
+def timestamp(value: datetime) -> str:
+    """An OANDA RFC 3339 timestamp, in nanoseconds."""
+    return f"{value.replace(tzinfo=None).isoformat()}.000000000Z"
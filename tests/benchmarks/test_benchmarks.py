@@ -0,0 +1,183 @@
+"""End-to-end benchmarks against a local OANDA stand-in server.
+
+Benchmarks are opt-in, and are run with `BENCHMARKS=1 pytest -m benchmark`.
+They are configured by the environment variables:
+
+- `BENCHMARK_SIZES`: comma-separated account sizes, in trades.
+- `BENCHMARK_LATENCY`: the server's response latency, in seconds.
+- `BENCHMARK_ROUNDS`: the timed rounds of each benchmark, keeping the best.
+- `BENCHMARK_TOLERANCE`: the slowdown over the best previous result, as a
+  fraction, failing a benchmark.
+- `BENCHMARK_RESULTS`: the JSON lines file results are appended to.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+from typer.testing import CliRunner
+
+from app import core
+from app.journal import metrics
+from app.journal.store import JournalStore
+from app.main import app
+from app.oanda import models
+from app.oanda.settings import oanda_settings
+from app.oanda.transport import decode
+
+from .server import StandInServer
+from .synthetic import ACCOUNT_ID, Synthetic
+
+SIZES = [
+    int(size)
+    for size in os.environ.get("BENCHMARK_SIZES", "10,1000").split(",")
+]
+LATENCY = float(os.environ.get("BENCHMARK_LATENCY", "0.0"))
+ROUNDS = int(os.environ.get("BENCHMARK_ROUNDS", "3"))
+TOLERANCE = float(os.environ.get("BENCHMARK_TOLERANCE", "0.5"))
+RESULTS = Path(
+    os.environ.get("BENCHMARK_RESULTS")
+    or Path(__file__).parents[2] / ".benchmarks" / "results.jsonl"
+)
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(
+        not os.environ.get("BENCHMARKS"),
+        reason="Benchmarks are run with BENCHMARKS=1.",
+    ),
+]
+
+runner = CliRunner()
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}-trades")
+def stand_in(
+    request: pytest.FixtureRequest,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> Iterator[StandInServer]:
+    """A stand-in server the application is configured against."""
+    with StandInServer(request.param, LATENCY) as server:
+        monkeypatch.setattr(oanda_settings, "API_URL", server.url)
+        monkeypatch.setattr(oanda_settings, "ACCOUNT_ID", ACCOUNT_ID)
+        monkeypatch.setattr(
+            core.settings.GlobalSettings,
+            "data_path",
+            property(lambda _: tmp_path),
+        )
+        yield server
+
+
+def test_account_command(stand_in: StandInServer) -> None:
+    """Benchmark showing the account."""
+    benchmark(
+        "journal account", stand_in.trades, command("account", "--fresh")
+    )
+
+
+def test_trades_command(stand_in: StandInServer) -> None:
+    """Benchmark showing all trades, paged from the server."""
+    run = command("trades", "--state", "all", "--fresh")
+    benchmark("journal trades", stand_in.trades, run)
+
+
+def test_trades_parsing(stand_in: StandInServer) -> None:
+    """Benchmark validating a page of all trades into journal trades."""
+    body = json.dumps(stand_in.page("ALL", stand_in.trades, None)).encode()
+
+    def run() -> None:
+        trades = decode(body, models.Trades).trades
+        assert len([trade.entry for trade in trades]) == stand_in.trades
+
+    benchmark("trades parsing", stand_in.trades, run)
+
+
+def test_store_upsert(stand_in: StandInServer, tmp_path: Path) -> None:
+    """Benchmark streaming synthetic journal trades into a new store."""
+    synthetic = Synthetic(stand_in.trades)
+
+    def run() -> None:
+        with JournalStore(tmp_path / f"{time.perf_counter_ns()}.db") as store:
+            assert store.upsert(synthetic.trades()) == stand_in.trades
+
+    benchmark("store upsert", stand_in.trades, run)
+
+
+def test_store_metrics(stand_in: StandInServer, tmp_path: Path) -> None:
+    """Benchmark loading the journal table and computing its metrics."""
+    store = JournalStore(tmp_path / "journal.db")
+    store.upsert(Synthetic(stand_in.trades).trades())
+
+    def run() -> None:
+        table = store.table()
+        metrics.summarize(table)
+        metrics.breakdown(table, metrics.Grouping.SYMBOL)
+
+    with store:
+        benchmark("store metrics", stand_in.trades, run)
+
+
+def command(*args: str) -> Callable[[], None]:
+    """A journal command run."""
+
+    def run() -> None:
+        result = runner.invoke(app, ["journal", *args])
+        assert result.exit_code == 0, result.output
+
+    return run
+
+
+def benchmark(name: str, size: int, run: Callable[[], None]) -> dict:
+    """Measure the best time and the peak memory of a run, saving the result.
+    Fails if slower than the best previous result by the tolerance."""
+    seconds = min(timed(run) for _ in range(ROUNDS))
+    tracemalloc.start()  # traced separately, as tracing slows runs down
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "size": size,
+        "latency": LATENCY,
+        "seconds": seconds,
+        "peak_bytes": peak,
+        "time": datetime.now(UTC).isoformat(),
+    }
+    previous = [
+        r["seconds"]
+        for r in load_results()
+        if (r["name"], r["size"], r["latency"]) == (name, size, LATENCY)
+    ]
+    RESULTS.parent.mkdir(parents=True, exist_ok=True)
+    with RESULTS.open("a") as file:
+        file.write(json.dumps(result) + "\n")
+
+    if previous:
+        best = min(previous)
+        assert seconds <= best * (1 + TOLERANCE), (
+            f"{name} ({size} trades) regressed: "
+            f"{seconds:.3f}s over a best of {best:.3f}s."
+        )
+    return result
+
+
+def timed(run: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def load_results() -> list[dict]:
+    """The previously saved results."""
+    if not RESULTS.exists():
+        return []
+    return [json.loads(line) for line in RESULTS.read_text().splitlines()]
@@ -0,0 +1,51 @@
+"""Synthetic trade history tests."""
+
+import io
+import json
+
+from app.journal.models import TradeDirection
+from app.oanda import models
+
+from .synthetic import Synthetic
+
+
+def test_synthetic_trades() -> None:
+    """Test trades being seeded, and covering the journal's cases."""
+
+    synthetic = Synthetic(1000, seed=1)
+    trades = list(synthetic.trades())
+    assert trades == list(Synthetic(1000, seed=1).trades())
+    assert trades != list(Synthetic(1000, seed=2).trades())
+    assert synthetic.trade(500) == trades[499]  # generated by ID
+
+    assert {t.entry.direction for t in trades} == set(TradeDirection)
+    assert len({t.entry.symbol for t in trades}) > 1
+    assert any(t.exit is None for t in trades)
+    assert any(t.exit and t.exit.fees > 0 for t in trades)
+    assert all(len(t.entry.indicators) == 3 for t in trades)
+
+
+def test_synthetic_payloads() -> None:
+    """Test OANDA payloads matching the journal trades."""
+
+    synthetic = Synthetic(1000)
+    for payload in synthetic.payloads():
+        trade = models.Trade.model_validate(payload)
+        expected = synthetic.trade(int(trade.id))
+        assert trade.exit == expected.exit
+        assert trade.entry == expected.entry.model_copy(
+            update={"indicators": {}}
+        )
+
+    states = [p["state"] for p in synthetic.payloads()]
+    assert states.count("OPEN") == len(list(synthetic.payloads("OPEN")))
+    assert any(  # partially closed
+        p["currentUnits"] not in ("0", p["initialUnits"])
+        for p in synthetic.payloads("OPEN")
+    )
+
+    file = io.StringIO()
+    synthetic.dump(file)
+    body = models.Trades.model_validate_json(file.getvalue())
+    assert len(body.trades) == 1000
+    assert json.loads(file.getvalue())["trades"][0]["id"] == "1000"
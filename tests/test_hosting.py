@@ -0,0 +1,167 @@
+"""Application hosting tests."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from blinker import Signal
+
+from app.core import Host, Lifetime, Services
+
+
+class Service:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_service_lifetimes() -> None:
+    """Test services being created once per lifetime."""
+
+    services = Services()
+    services.register(Service, Service, Lifetime.TRANSIENT)
+    assert services[Service] is not services[Service]
+
+    services = Services()
+    services[Service] = Service  # singleton
+    assert services[Service] is services[Service]
+    with pytest.raises(KeyError):
+        services[Service] = Service
+
+    instance = Service()
+    services = Services()
+    services[Service] = instance
+    assert services[Service] is instance
+    with pytest.raises(KeyError):
+        services[str]
+    services.register(int, lambda: "1")
+    with pytest.raises(TypeError):
+        services[int]
+
+
+def test_service_construction() -> None:
+    """Test services being created lazily and once across threads."""
+
+    created = []
+
+    def create() -> Service:
+        created.append(threading.get_ident())
+        time.sleep(0.05)
+        return Service()
+
+    services = Services()
+    services.register(Service, create)
+    assert not created
+
+    results: list[Service] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(services[Service]))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_async_services() -> None:
+    """Test async factories being awaited once."""
+
+    created: list[Service] = []
+
+    async def create() -> Service:
+        await asyncio.sleep(0.01)
+        created.append(Service())
+        return created[-1]
+
+    async def close(service: Service) -> None:
+        service.close()
+
+    services = Services()
+    services.register(Service, create, dispose=close)
+    with pytest.raises(TypeError):
+        services[Service]
+
+    async def lookup() -> list[Service]:
+        return await asyncio.gather(
+            *(services.aget(Service) for _ in range(3))
+        )
+
+    results = asyncio.run(lookup())
+    assert all(result is results[0] for result in results)
+    assert asyncio.run(services.aget(Service)) is results[0]
+    assert len(created) == 1
+    assert not results[0].closed
+
+
+def test_service_disposal(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test services being disposed when hosts stop, unless served."""
+
+    services = Services()
+    services.register(Service, Service, dispose=Service.close)
+    services.register(object, object, Lifetime.SCOPED)
+    monkeypatch.setattr(Host, "dependencies", services)
+    Host.shutdown.connect(services.on_shutdown)
+
+    singleton, scoped = services[Service], services[object]
+    monkeypatch.setattr(Host, "is_serving", True)
+    Host.shutdown.send(None)
+    assert services[Service] is singleton and not singleton.closed
+    assert services[object] is not scoped
+
+    monkeypatch.setattr(Host, "is_serving", False)
+    Host.shutdown.send(None)
+    assert singleton.closed
+    assert services[Service] is not singleton
+    Host.shutdown.disconnect(services.on_shutdown)
+
+
+def test_concurrent_startup() -> None:
+    """Test lifecycle receivers running concurrently."""
+
+    startup, received = Signal(), []
+
+    def receiver(_: Host) -> None:
+        time.sleep(0.1)
+        received.append(threading.get_ident())
+
+    async def async_receiver(_: Host) -> None:
+        await asyncio.sleep(0.1)
+        received.append(None)
+
+    startup.connect(receiver, weak=False)
+    startup.connect(async_receiver, weak=False)
+    start = time.perf_counter()
+    Host("test").send(startup)
+    assert time.perf_counter() - start < 0.2
+    assert len(received) == 2
+
+
+def test_background_tasks() -> None:
+    """Test prefetched work being awaited, and waited for on stop."""
+
+    host, started = Host("test"), threading.Event()
+    host.prefetch("value", lambda: started.set() or time.sleep(0.05) or 1)
+    started.wait()
+    assert host.prefetched("value", lambda: 2) == 1
+    assert host.prefetched("value", lambda: 2) == 2  # not prefetched
+
+    finished, started = [], threading.Event()
+    host.prefetch(
+        "slow", lambda: started.set() or time.sleep(0.05) or finished.append(1)
+    )
+    started.wait()
+    host.cancel_tasks()
+    assert finished and not host.tasks
+
+    host.stop_timeout, release = 0.01, threading.Event()
+    task = host.prefetch("stuck", release.wait)
+    host.cancel_tasks()  # abandoned
+    assert not task.done() and not host.tasks
+    release.set()
+    assert task.result(1) is True
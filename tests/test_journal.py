@@ -0,0 +1,302 @@
+"""Journal tests."""
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.timeseries import CANDLE_DTYPE, to_datetime64
+from app.journal import watch
+from app.journal.indicators import backfill_indicators, ema
+from app.journal.metrics import (
+    Grouping,
+    breakdown,
+    equity_curve,
+    r_multiples,
+    realized_pnl,
+    summarize,
+)
+from app.journal.models import (
+    Account,
+    Indicators,
+    Trade,
+    TradeDirection,
+    TradeEntry,
+    TradeExit,
+)
+from app.journal.store import SCHEMA, JournalStore
+from app.journal.table import TradeTable
+from app.journal.watch import AccountChange, ChangeKind, TradeChange, Watcher
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def make_trade(
+    id: int,
+    symbol: str = "EUR_USD",
+    direction: TradeDirection = TradeDirection.LONG,
+    closed: bool = True,
+) -> Trade:
+    """Create a journal trade entered `id` hours after the start."""
+    entry = TradeEntry(
+        trade_id=str(id),
+        symbol=symbol,
+        entry_timestamp=START + timedelta(hours=id),
+        entry_price=1.1,
+        quantity=1000,
+        direction=direction,
+        stop_loss=1.09,
+        indicators={
+            timedelta(hours=1): Indicators(
+                ema=1.1, stochastic=50, rsi=40, macd=0.001
+            )
+        },
+        is_filled=True,
+    )
+    exit = TradeExit(
+        trade_id=str(id),
+        exit_timestamp=START + timedelta(hours=id, minutes=30),
+        exit_price=1.11,
+        fees=0.5,
+    )
+    return Trade(entry=entry, exit=exit if closed else None)
+
+
+def test_store(tmp_path: Path) -> None:
+    """Test trades being stored and queried."""
+
+    with JournalStore(tmp_path / "journal.db") as store:
+        trades = [
+            make_trade(1),
+            make_trade(2, "GBP_USD", TradeDirection.SHORT),
+            make_trade(3, closed=False),
+        ]
+        assert store.upsert(trades) == 3
+        assert store.get("1") == trades[0]
+        assert store.get("3") == trades[2]
+        assert store.symbols() == ["EUR_USD", "GBP_USD"]
+
+        store.upsert([make_trade(3)])  # close the open trade
+        assert store.get("3").exit is not None  # type: ignore
+
+        synced = make_trade(1)  # brokers have no indicators
+        synced.entry.indicators = {}
+        store.upsert([synced])
+        assert store.get("1") == trades[0]
+
+        query = store.query(symbol="EUR_USD")
+        assert [t.entry.trade_id for t in query] == ["1", "3"]
+        query = store.query(direction=TradeDirection.SHORT)
+        assert [t.entry.trade_id for t in query] == ["2"]
+        query = store.query(
+            start=START + timedelta(hours=2), end=START + timedelta(hours=3)
+        )
+        assert [t.entry.trade_id for t in query] == ["2", "3"]
+        assert len(list(store.query(limit=1))) == 1
+
+
+def test_store_open(tmp_path: Path) -> None:
+    """Test a store being opened by concurrent threads."""
+
+    with JournalStore(tmp_path / "journal.db") as store:
+        with ThreadPoolExecutor(8) as pool:
+            connections = list(pool.map(lambda _: store.connection, range(8)))
+        assert all(c is connections[0] for c in connections)
+        assert store.symbols() == []
+
+
+def test_table() -> None:
+    """Test trades being converted to and from columns."""
+
+    trades = [
+        make_trade(2, "GBP_USD", TradeDirection.SHORT),
+        make_trade(1),
+        make_trade(3, closed=False),
+    ]
+    table = TradeTable.from_trades(trades)
+    assert len(table) == 3
+    assert table.direction.tolist() == [-1, 1, 1]
+    assert table.is_closed.tolist() == [True, True, False]
+    assert np.isnan(table.exit_price[2])
+    assert list(table) == trades
+
+    table = table.sort()
+    assert table.trade_id.tolist() == ["1", "2", "3"]
+    assert table[table.symbol == "EUR_USD"].trade_id.tolist() == ["1", "3"]
+    assert len(TradeTable.from_trades([])) == 0
+
+
+def test_metrics() -> None:
+    """Test performance metrics being computed per group."""
+
+    trades = [
+        make_trade(1),  # +10 - 0.5 fees
+        make_trade(2, "GBP_USD", TradeDirection.SHORT),  # -10 - 0.5 fees
+        make_trade(3),
+        make_trade(4, closed=False),
+    ]
+    table = TradeTable.from_trades(trades)
+    assert np.allclose(realized_pnl(table)[:3], [9.5, -10.5, 9.5])
+    assert np.isnan(realized_pnl(table)[3])
+    assert np.allclose(r_multiples(table)[:3], [0.95, -1.05, 0.95])
+
+    summary = summarize(table)
+    assert summary.trades == 3 and summary.wins == 2
+    assert np.isclose(summary.total_pnl, 8.5)
+    assert np.isclose(summary.profit_factor, 19 / 10.5)
+    assert np.isclose(summary.max_drawdown, 10.5)
+    assert np.allclose(equity_curve(table)[1], [9.5, -1.0, 8.5])
+
+    by_symbol = breakdown(table, Grouping.SYMBOL)
+    assert by_symbol["EUR_USD"].trades == 2
+    assert by_symbol["EUR_USD"].max_drawdown == 0
+    assert np.isinf(by_symbol["EUR_USD"].profit_factor)
+    assert by_symbol["GBP_USD"].win_rate == 0
+    assert np.isclose(by_symbol["GBP_USD"].max_drawdown, 10.5)
+    assert breakdown(table, Grouping.DIRECTION)["short"].trades == 1
+
+    trade = make_trade(5, "USD_JPY")  # quoted in JPY, realized in USD
+    trade.exit.realized_pl = 0.067  # type: ignore
+    table = TradeTable.from_trades([trade])
+    assert np.allclose(realized_pnl(table), [0.067 - 0.5])
+    assert np.allclose(r_multiples(table), [(0.067 - 0.5) / 0.067])
+
+
+def test_store_table(tmp_path: Path) -> None:
+    """Test trades being read from the store as a table."""
+
+    trades = [make_trade(1), make_trade(2, closed=False)]
+    trades[0].exit.realized_pl = 10.0  # type: ignore
+    with JournalStore(tmp_path / "journal.db") as store:
+        store.upsert(trades)
+        assert list(store.table()) == trades
+
+    path = tmp_path / "old.db"  # created without the realized P/L column
+    with sqlite3.connect(path) as connection:
+        connection.executescript(
+            SCHEMA.replace("fees REAL,\n    realized_pl REAL", "fees REAL")
+        )
+    connection.close()
+    with JournalStore(path) as store:
+        store.upsert(trades)
+        assert store.get("1") == trades[0]
+        assert len(store.table(symbol="GBP_USD")) == 0
+
+
+def test_indicators() -> None:
+    """Test indicators being sampled from one candle fetch per series."""
+
+    fetches: list[tuple[str, timedelta]] = []
+
+    def candles(
+        symbol: str, timeframe: timedelta, start: datetime, end: datetime
+    ) -> np.ndarray:
+        fetches.append((symbol, timeframe))
+        assert start < START < end
+        times = np.arange(to_datetime64(start), to_datetime64(end), timeframe)
+        series = np.zeros(len(times), dtype=CANDLE_DTYPE)
+        series["time"] = times
+        series["close"] = np.arange(len(times), dtype=float)
+        series["high"] = series["close"] + 1
+        series["low"] = series["close"] - 1
+        return series
+
+    trades = [make_trade(1), make_trade(2, "GBP_USD"), make_trade(3)]
+    timeframes = [timedelta(hours=1), timedelta(days=1)]
+    table = TradeTable.from_trades(trades)
+    table = backfill_indicators(table, candles, timeframes)
+    assert sorted(fetches) == sorted(
+        (symbol, timeframe)
+        for symbol in ("EUR_USD", "GBP_USD")
+        for timeframe in timeframes
+    )
+
+    hourly = [values[timedelta(hours=1)] for values in table.indicators]
+    assert all(i.rsi == 100 for i in hourly)  # rising closes
+    assert hourly[2].ema > hourly[0].ema
+    assert timedelta(days=1) in table.indicators[0]
+    assert list(table)[0].entry.indicators[timedelta(hours=1)] == hourly[0]
+
+
+def test_ema() -> None:
+    """Test the block EMA matching the recursive definition."""
+
+    values = np.random.default_rng(0).normal(size=1000).cumsum()
+    for alpha in (0.001, 2 / 21, 0.5, 1.0):
+        expected, state = [], values[0]
+        for value in values:
+            state += alpha * (value - state)
+            expected.append(state)
+        assert np.allclose(ema(values, alpha), expected)
+
+
+def test_watcher(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test account changes being diffed, and polls adapting to activity."""
+
+    def account(last_id: int, balance: float, open_trades: int) -> Account:
+        return Account(
+            id="1",
+            last_transaction_id=str(last_id),
+            currency="USD",  # type: ignore
+            commission=0,
+            balance=balance,
+            realized_pl=0,
+            unrealized_pl=0,
+            margin_rate=0.02,
+            margin_used=open_trades * 100.0,
+            margin_available=balance - open_trades * 100.0,
+            open_trade_count=open_trades,
+        )
+
+    accounts = iter(
+        [
+            account(1, 1000, 0),
+            account(1, 1000, 0),  # idle
+            account(2, 1000, 1),  # opened
+            account(2, 1000, 1),  # trading
+            account(3, 1010, 0),  # closed
+            account(3, 1010, 0),  # idle
+            account(3, 1010, 0),
+        ]
+    )
+    changes = {
+        "1": ([make_trade(1, closed=False)], "2"),
+        "2": ([make_trade(1)], "3"),
+    }
+    since: list[str] = []
+    delays: list[float] = []
+
+    class FakeBroker:
+        def get_account(self) -> Account:
+            return next(accounts)
+
+        def get_trade_changes(self, since_id: str) -> tuple[list[Trade], str]:
+            since.append(since_id)
+            return changes[since_id]
+
+    monkeypatch.setattr(watch.time, "sleep", delays.append)
+    watcher = Watcher(FakeBroker(), interval=1, idle_interval=3)  # type: ignore
+    polls = [watcher.poll() for _ in range(7)]
+
+    assert since == ["1", "2"]  # only retrieved on new transactions
+    assert [len(poll) for poll in polls] == [0, 0, 3, 0, 4, 0, 0]
+    opened = polls[2][-1]
+    assert isinstance(opened, TradeChange)
+    assert opened.kind == ChangeKind.OPENED
+    closed = polls[4]
+    assert [c.name for c in closed if isinstance(c, AccountChange)] == [
+        "balance",
+        "margin_used",
+        "margin_available",
+    ]
+    assert isinstance(closed[-1], TradeChange)
+    assert closed[-1].kind == ChangeKind.CLOSED
+    assert watcher.delay == 3  # backed off to the idle interval
+
+    watcher = Watcher(FakeBroker(), interval=1, idle_interval=3)  # type: ignore
+    accounts = iter([account(3, 1010, 0)] * 3 + [account(3, 1005, 0)])
+    assert next(iter(watcher)).current == 1005  # type: ignore
+    assert delays == [2, 3, 3]
@@ -1,8 +1,32 @@
 """Main tests."""
 
+import json
+import os
+import queue
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import pytest
+import typer
+from typer.core import TyperGroup
 from typer.testing import CliRunner
 
-from app.main import app
+from app import core
+from app.client import (
+    GROUPS,
+    LOCAL_COMMANDS,
+    LOCAL_OPTIONS,
+    VALUE_OPTIONS,
+    forward,
+    is_local,
+)
+from app.core import logging
+from app.main import LazySubcommand, app
 
 runner = CliRunner()
 
@@ -33,3 +57,273 @@ def test_app_debug() -> None:
 
     result = runner.invoke(app, ["-d", "test"])
     assert "DEBUG" in result.stdout.split("\n")[0]
+
+
+def test_daemon(tmp_path: Path, capfd: pytest.CaptureFixture) -> None:
+    """Test commands being forwarded to a running daemon."""
+
+    path = tmp_path / "daemon.sock"
+    assert forward(["echo", "hi"], path) is None  # not running
+
+    script = f"""
+from pathlib import Path
+
+import typer
+from app.daemon import Daemon
+
+app = typer.Typer()
+
+@app.command()
+def echo(text: str) -> None:
+    print(text)
+
+@app.command()
+def fail() -> None:
+    raise typer.Exit(3)
+
+Daemon(typer.main.get_command(app), Path({str(path)!r})).serve()
+"""
+    daemon = subprocess.Popen([sys.executable, "-c", script])
+    try:
+        for _ in range(100):
+            if path.exists():
+                break
+            time.sleep(0.05)
+
+        assert path.stat().st_mode & 0o777 == 0o600
+        assert forward(["echo", "hi"], path) == 0
+        assert forward(["fail"], path) == 3
+        assert forward(["clean"], path) is None  # interactive
+        assert capfd.readouterr().out == "hi\n"
+
+        uid = os.getuid()
+        with pytest.MonkeyPatch.context() as context:
+            context.setattr(os, "getuid", lambda: uid + 1)
+            assert forward(["echo", "hi"], path) is None  # not ours
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+
+def test_local_commands() -> None:
+    """Test commands run locally being resolved from their arguments."""
+
+    assert is_local(["journal", "stream"])
+    assert is_local(["-d", "journal", "watch", "--interval", "1"])
+    assert is_local(["logs", "--level", "info", "-f"])
+    assert is_local(["--env=development", "version"])
+    assert is_local(["journal", "config", "-e"])
+    assert not is_local(["journal", "review", "--symbol", "stream"])
+    assert not is_local(["logs", "--logger", "serve"])
+    assert not is_local(["journal", "sync", "-f"])
+
+    def resolve(path: tuple[str, ...]) -> Any:
+        command = typer.main.get_command(app)
+        for name in path:
+            command = command.commands[name]  # type: ignore
+            if isinstance(command, LazySubcommand):
+                command = command.command
+        return command
+
+    for path in GROUPS:  # the client resolves commands without the app
+        group = resolve(path)
+        assert isinstance(group, TyperGroup), path
+        assert {
+            name
+            for param in group.params
+            if param.param_type_name == "option" and not param.is_flag
+            for name in param.opts
+        } <= VALUE_OPTIONS, path
+    for path in LOCAL_COMMANDS:
+        assert resolve(path)
+    for path, options in LOCAL_OPTIONS.items():
+        command = resolve(path)
+        assert options <= {name for p in command.params for name in p.opts}
+
+
+def test_logging(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test log records being written by the background listener, and
+    dropped records being reported."""
+
+    core.setup_logging()
+    logger = core.create_logger("test", tmp_path)
+    logger.debug("[bold]Payload:[/] %s", core.Lazy(str.upper, "lazy"))
+    core.flush_logs()
+    log = (tmp_path / "test.log").read_text()
+    assert "DEBUG    [test] Payload: LAZY" in log
+    core.close_files()
+
+    records: queue.Queue = queue.Queue(1)
+    handler = logging.AsyncHandler(records, core.DropPolicy.DROP)
+    logger.addHandler(handler)
+    logger.info("queued")
+    logger.info("dropped")
+    logger.removeHandler(handler)
+    assert records.qsize() == 1 and handler.dropped == 1
+
+    records.get_nowait()  # room for the report
+    logging.getLogger().addHandler(handler)
+    try:
+        capsys.readouterr()
+        core.flush_logs()
+    finally:
+        logging.getLogger().removeHandler(handler)
+    assert "Dropped 1 log records" in capsys.readouterr().out
+    assert not handler.dropped
+
+
+def test_log_viewer(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture,
+) -> None:
+    """Test log runs being read and filtered through the log index, and
+    new records being followed."""
+
+    log_file = tmp_path / "test.log"
+    for run in range(3):
+        handler = logging.file_handler(log_file)
+        for name, level in [("test", "DEBUG"), ("test.x", "INFO")]:
+            record = logging.makeLogRecord(
+                {"name": name, "levelname": level, "msg": f"run {run} {name}"}
+            )
+            record.levelno = logging.getLevelName(level)
+            handler.handle(record)
+        handler.close()
+    assert len(logging.read_index(log_file)) == 3
+
+    capsys.readouterr()
+    core.view_logs(log_file, run=1, level="info", logger="test")
+    output = capsys.readouterr().out
+    assert "run 1 test.x" in output
+    assert "run 1 test " not in output and "run 2" not in output
+
+    logging.index_path(log_file).unlink()  # rebuilt from the run headers
+    assert len(logging.read_index(log_file)) == 3
+
+    handler = logging.RunFileHandler(log_file, max_bytes=256, backups=1)
+    for _ in range(8):
+        handler.handle(logging.makeLogRecord({"msg": "x" * 64}))
+    handler.close()
+    assert logging.read_index(log_file)[0].offset == 0  # continued run
+    assert logging.index_path(tmp_path / "test.log.1").exists()
+
+    log_file = tmp_path / "rotated.log"
+    for name in ("first", "second"):
+        handler = logging.RunFileHandler(log_file, max_bytes=256, backups=5)
+        for _ in range(8):
+            handler.handle(logging.makeLogRecord({"msg": name * 8}))
+        handler.close()
+    assert "first" not in log_file.read_text()  # rotated out
+
+    capsys.readouterr()
+    core.view_logs(log_file, run=1)
+    output = capsys.readouterr().out
+    assert output.count("first" * 8) == 8 and "second" not in output
+
+    def follow_lines(file: Path, stream: Any) -> Any:
+        assert stream.tell() == file.stat().st_size  # tailed from the end
+        yield "followed"
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(logging, "follow_lines", follow_lines)
+    core.view_logs(log_file, follow=True)
+    output = capsys.readouterr().out
+    assert "first" * 8 in output and output.endswith("followed\n")
+
+
+def test_log_query(tmp_path: Path) -> None:
+    """Test structured log records being queried across runs."""
+
+    for run in range(3):
+        core.setup_logging(command=f"sync {run}")
+        logger = core.create_logger("query", tmp_path)
+        logger.info("synced", extra={"duration": run, "trades": run * 10})
+        core.flush_logs()
+    core.close_files()
+
+    records = [
+        json.loads(record)
+        for record in core.query_logs(tmp_path / "query.jsonl", level="info")
+    ]
+    assert [r["command"] for r in records] == ["sync 0", "sync 1", "sync 2"]
+    assert len({r["run"] for r in records}) == 3
+
+    query = partial(core.query_logs, tmp_path / "query.jsonl")
+    assert len(list(query(slower_than=1))) == 2
+    assert len(list(query(fields={"trades": "20"}))) == 1
+    assert len(list(query(run=records[1]["run"], level="info"))) == 1
+    assert not list(query(since=datetime.now()))
+
+
+def test_profiler(tmp_path: Path) -> None:
+    """Test spans being summarized and profiles saved by the host that
+    enabled the profiler."""
+
+    profiler = core.Profiler()
+    host = core.Host("test")
+    profiler.enable(core.ProfileDump.FLAME, tmp_path)
+    profiler.on_startup(host)
+    profiler.on_startup(host)  # nested host
+    for _ in range(2):
+        with profiler.span("http"):
+            time.sleep(0.01)
+
+    profiler.on_shutdown(host)
+    assert not list(tmp_path.iterdir())  # outer host still running
+    assert len(profiler.spans["http"]) == 2
+    assert profiler.summary(1.0).row_count == 2
+
+    profiler.on_shutdown(host)
+    (file,) = tmp_path.iterdir()
+    assert file.suffix == ".folded"
+    assert "test_profiler" in file.read_text()
+    assert not profiler.enabled and not profiler.spans["http"]
+
+    profiler.on_startup(host)  # daemon host
+    profiler.record("http", 1.0)
+    profiler.enable(core.ProfileDump.CPROFILE, tmp_path)
+    profiler.on_startup(host)
+    assert not profiler.spans["http"]  # recorded before the command
+    profiler.on_shutdown(host)
+    assert not profiler.enabled and len(list(tmp_path.iterdir())) == 2
+    assert profiler.depth == 1
+
+
+class SnapshotSettings(core.Settings):
+    VALUE: int = 1
+    TIMEFRAME: timedelta = timedelta(hours=1)
+
+
+def test_settings_snapshot(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test settings being loaded from a snapshot until a source changes."""
+
+    monkeypatch.setattr(
+        core.settings.GlobalSettings, "data_path", property(lambda _: tmp_path)
+    )
+    monkeypatch.setattr(core.Settings, "loaded_keys", {})
+    monkeypatch.setattr(  # read uncached, as the environment is patched
+        core.settings, "environment", core.settings.environment.__wrapped__
+    )
+    settings = SnapshotSettings.load()
+    assert (tmp_path / core.settings.SNAPSHOT_FILE).exists()
+    assert settings.settings_json_file().exists()
+
+    def resolve(*_: object) -> None:
+        raise AssertionError("Sources resolved.")
+
+    with monkeypatch.context() as context:
+        context.setattr(SnapshotSettings, "__init__", resolve)
+        assert SnapshotSettings.load() == settings
+
+    monkeypatch.setenv("VALUE", "2")
+    assert SnapshotSettings.load().VALUE == 2
+
+    file = settings.settings_json_file()
+    file.write_text('{"TIMEFRAME": "PT15M"}')
+    os.utime(file, ns=(0, 0))  # changed within the mtime resolution
+    assert core.Settings.changed() == ["SnapshotSettings"]
+    assert SnapshotSettings.load().TIMEFRAME == timedelta(minutes=15)
+    assert not core.Settings.changed()
@@ -0,0 +1,516 @@
+"""OANDA client tests."""
+
+import asyncio
+import json
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import Mock
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+import requests
+from pydantic import ValidationError
+
+from app.journal.models import TradeDirection, TradeExit
+from app.oanda import api, cache, candles, models
+from app.oanda.scheduler import Scheduler, SchedulerStats, TokenBucket
+from app.oanda.settings import oanda_settings
+from app.oanda.stream import StreamState, TransactionStream, stream_trades
+from app.oanda.sync import SyncState, save_sync, sync_trades
+from app.oanda.transport import Transport, decode
+
+
+def test_transport_session() -> None:
+    """Test the transport reusing a single pooled session."""
+
+    transport = Transport(pool_size=4, timeout=1.5, max_concurrency=2)
+    session = transport.session
+    assert transport.session is session
+    assert transport.timeout == 1.5
+
+    adapter = session.get_adapter(oanda_settings.base_url)
+    assert adapter._pool_maxsize == 4  # type: ignore
+    assert session.headers["Accept-Encoding"] == "gzip, deflate"
+
+    transport.close()
+    assert transport.session is not session
+
+
+def test_transport_concurrency(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test async requests running concurrently up to the limit."""
+
+    transport = Transport(max_concurrency=3)
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def get(url: str, **_: Any) -> str:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return url
+
+    monkeypatch.setattr(transport, "get", get)
+
+    async def fetch() -> list[str]:
+        urls = [f"url-{i}" for i in range(9)]
+        return await asyncio.gather(*(transport.aget(url) for url in urls))
+
+    assert asyncio.run(fetch()) == [f"url-{i}" for i in range(9)]
+    assert peak == 3
+    transport.close()
+
+
+def trade_payload(id: int, state: str = "OPEN", **fields: Any) -> dict:
+    """Create an OANDA trade payload."""
+    return {
+        "id": str(id),
+        "instrument": "EUR_USD",
+        "price": "1.10000",
+        "openTime": "2024-01-02T10:00:00.000000000Z",
+        "state": state,
+        "initialUnits": "1000",
+        "currentUnits": "1000" if state == "OPEN" else "0",
+        "realizedPL": "0.0000",
+        **fields,
+    }
+
+
+class FakeResponse:
+    def __init__(self, payload: dict) -> None:
+        self.content = json.dumps(payload).encode()
+
+
+def serve(
+    monkeypatch: pytest.MonkeyPatch, handler: Callable[..., dict]
+) -> None:
+    """Serve API requests from a handler of the URL and query params."""
+
+    def get(url: str, params: dict | None = None, **_: Any) -> FakeResponse:
+        return FakeResponse(handler(url, **(params or {})))
+
+    monkeypatch.setattr(api.transport, "get", get)
+
+
+def test_iter_trades(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test trades being paged backwards through the history."""
+
+    requests: list[dict] = []
+
+    def handler(url: str, **params: Any) -> dict:
+        requests.append(params)
+        before = params.get("beforeID", 7)  # inclusive
+        ids = range(before, max(before - params["count"], 0), -1)
+        return {"trades": [trade_payload(id, "CLOSED") for id in ids]}
+
+    serve(monkeypatch, handler)
+    trades = api.iter_trades(page_size=3)
+    assert [t.id for t in trades] == ["7", "6", "5", "4", "3", "2", "1"]
+    assert [r.get("beforeID") for r in requests] == [None, 4, 1]
+    assert len(list(api.iter_trades(page_size=1))) == 7
+    assert all(r["state"] == "CLOSED" for r in requests)
+
+
+def test_response_cache(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test cached responses being served and revalidated in the background."""
+
+    sent: list[dict] = []
+
+    def get(url: str, headers: dict, **_: Any) -> Mock:
+        sent.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return Mock(status_code=304)
+        return Mock(status_code=200, content=b"{}", headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(cache.transport, "get", get)
+    response_cache = cache.ResponseCache(tmp_path)
+
+    assert response_cache.get("url", ttl=60) == b"{}"  # fetched
+    assert response_cache.get("url", ttl=60) == b"{}"  # fresh
+    assert sent == [{}]
+
+    assert response_cache.get("url", ttl=0) == b"{}"  # stale, refreshed
+    response_cache.wait()
+    assert sent == [{}, {"If-None-Match": '"v1"'}]
+
+    assert response_cache.get("url", {"count": 1}, ttl=60) == b"{}"
+    assert len(sent) == 3  # params are part of the key
+
+
+def test_sync_trades(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Test trades being synchronized incrementally."""
+
+    path = tmp_path / "sync.json"
+    monkeypatch.setattr(SyncState, "path", classmethod(lambda _: path))
+    monkeypatch.setattr(
+        api, "get_account", lambda: Mock(last_transaction_id="10")
+    )
+    monkeypatch.setattr(
+        api,
+        "iter_trades",
+        lambda _: (
+            models.Trade.model_validate(trade_payload(id)) for id in (2, 1)
+        ),
+    )
+    trades = sync_trades()
+    assert [t.id for t in trades.trades] == ["1", "2"]
+    assert trades.last_transaction_id == "10"
+    assert SyncState.load().last_transaction_id is None  # not stored yet
+    save_sync("10")
+
+    def handler(url: str, sinceTransactionID: str) -> dict:
+        assert url == models.AccountChanges.path()
+        assert sinceTransactionID == "10"
+        return {
+            "changes": {
+                "tradesOpened": [trade_payload(3)],
+                "tradesClosed": [trade_payload(1, "CLOSED")],
+            },
+            "lastTransactionID": "12",
+        }
+
+    serve(monkeypatch, handler)
+    trades = sync_trades()
+    assert [t.id for t in trades.trades] == ["1", "3"]  # only the changes
+    assert trades.trades[0].state == models.TradeState.CLOSED
+    assert trades.last_transaction_id == "12"
+    save_sync("12")
+    assert json.loads(path.read_text()) == {"lastTransactionID": "12"}
+
+
+def candles_payload(start: datetime, end: datetime, step: timedelta) -> dict:
+    """Create an OANDA candles payload within a time range."""
+    candles = []
+    while start < end:
+        price = {"o": "1.1", "h": "1.2", "l": "1.0", "c": "1.15"}
+        time = start.isoformat().replace("+00:00", ".000000000Z")
+        candles.append(
+            {"time": time, "volume": 10, "complete": True, "mid": price}
+        )
+        start += step
+    return {"instrument": "EUR_USD", "granularity": "H1", "candles": candles}
+
+
+def test_get_candles(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Test candles being cached and only missing ranges fetched."""
+
+    requests: list[tuple[datetime, datetime]] = []
+
+    def handler(url: str, **params: Any) -> dict:
+        assert params["granularity"] == "H1"
+        start = datetime.fromisoformat(params["from"])
+        end = datetime.fromisoformat(params["to"])
+        requests.append((start, end))
+        return candles_payload(start, end, timedelta(hours=1))
+
+    serve(monkeypatch, handler)
+    monkeypatch.setattr(candles, "MAX_CANDLES", 10)
+    monkeypatch.setattr(candles.candle_store, "_path", tmp_path)
+
+    def get(start: int, end: int) -> np.ndarray:
+        return api.get_candles(
+            "EUR_USD", timedelta(hours=1), at(start), at(end)
+        )
+
+    def at(hour: int) -> datetime:
+        return datetime(2024, 1, 1, tzinfo=UTC) + timedelta(hours=hour)
+
+    assert len(get(0, 25)) == 25
+    assert requests == [(at(0), at(10)), (at(10), at(20)), (at(20), at(25))]
+
+    requests.clear()
+    assert len(get(30, 35)) == 5
+    assert len(get(5, 35)) == 30
+    assert requests == [(at(30), at(35)), (at(25), at(30))]
+
+    requests.clear()
+    series = get(0, 35)
+    assert requests == []
+    assert np.all(np.diff(series["time"]) == np.timedelta64(1, "h"))
+
+
+def test_plan_candle_requests() -> None:
+    """Test gaps being coalesced into the fewest requests."""
+
+    def hours(*ranges: tuple[int, int]) -> list:
+        start = np.datetime64("2024-01-01T00", "us")
+        hour = np.timedelta64(1, "h")
+        return [(start + s * hour, start + e * hour) for s, e in ranges]
+
+    span = np.timedelta64(10, "h")
+    assert candles.plan(hours((0, 2), (4, 6), (8, 10)), span) == hours((0, 10))
+    assert candles.plan(hours((0, 2), (9, 12)), span) == hours((0, 2), (9, 12))
+    assert candles.plan(hours((0, 25)), span) == hours(
+        (0, 10), (10, 20), (20, 25)
+    )
+    ranges = hours((0, 5), (5, 8), (10, 12))
+    assert candles.union(ranges) == hours((0, 8), (10, 12))
+    assert candles.subtract(hours((2, 14))[0], hours((0, 8), (10, 12))) == (
+        hours((8, 10), (12, 14))
+    )
+
+
+def test_token_bucket() -> None:
+    """Test requests being spaced out by the rate limit."""
+
+    now = 0.0
+
+    def sleep(seconds: float) -> None:
+        nonlocal now
+        now += seconds
+
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now, sleep=sleep)
+    assert [bucket.acquire() for _ in range(2)] == [0, 0]
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert bucket.acquire() == pytest.approx(0.1)
+    now += 1.0  # refill up to capacity
+    assert [bucket.acquire() for _ in range(2)] == [0, 0]
+
+
+def test_scheduler_retries() -> None:
+    """Test throttled and failed requests being retried."""
+
+    delays: list[float] = []
+    scheduler = Scheduler(rate=1000, max_retries=2, sleep=delays.append)
+
+    def response(status: int, **headers: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        return response
+
+    responses = iter([response(429, **{"Retry-After": "3"}), response(200)])
+    assert scheduler.send(lambda: next(responses)).status_code == 200
+    assert delays == [3.0]
+
+    def fail() -> requests.Response:
+        raise requests.ConnectionError()
+
+    with pytest.raises(requests.ConnectionError):
+        scheduler.send(fail)
+    assert len(delays) == 3 and all(0 <= d <= 1.0 for d in delays[1:])
+
+    assert scheduler.send(lambda: response(503), False).status_code == 503
+    assert scheduler.stats == SchedulerStats(
+        requests=6, throttled=1, retried=3, failed=2
+    )
+
+
+def test_lazy_trades() -> None:
+    """Test trades being decoded lazily from the response bytes."""
+
+    payload = {
+        "trades": [trade_payload(1, unused="field"), {"id": "invalid"}],
+        "lastTransactionID": "3",
+    }
+    trades = decode(FakeResponse(payload), models.Trades)  # type: ignore
+    assert trades.last_transaction_id == "3"
+    assert len(trades.trades) == 2
+
+    trade = trades.trades[0]  # only accessed trades are validated
+    assert trades.trades[0] is trade
+    assert "unused" not in trade.model_dump()
+    with pytest.raises(ValidationError):
+        trades.trades[1]
+
+    account = {"account": {"id": "1"}, "lastTransactionID": "3"}
+    with pytest.raises(ValidationError):  # envelopes are validated eagerly
+        decode(FakeResponse(account), models.Account, "account")  # type: ignore
+
+
+def fill_payload(id: int, opened: str | None, closed: str | None) -> dict:
+    """Create an OANDA order fill transaction payload."""
+    return {
+        "id": str(id),
+        "type": "ORDER_FILL",
+        "time": f"2024-01-02T10:0{id}:00.000000000Z",
+        "instrument": "EUR_USD",
+        **(
+            {
+                "tradeOpened": {
+                    "tradeID": opened,
+                    "units": "-100",
+                    "price": "1.1",
+                }
+            }
+            if opened
+            else {}
+        ),
+        "tradesClosed": (
+            [
+                {
+                    "tradeID": closed,
+                    "units": "100",
+                    "price": "1.2",
+                    "realizedPL": "-10.0",
+                    "financing": "-0.5",
+                }
+            ]
+            if closed
+            else []
+        ),
+    }
+
+
+def test_transaction_stream(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test fills being streamed, and backfilled after reconnecting."""
+
+    heartbeat = {"type": "HEARTBEAT", "time": "2024-01-02T10:00:00Z"}
+    connections: list[str] = []
+    backfills: list[str] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            if url.path.endswith("/sinceid"):
+                backfills.append(parse_qs(url.query)["id"][0])
+                body = {
+                    "transactions": [fill_payload(3, None, "2")],
+                    "lastTransactionID": "3",
+                }
+                lines = [body]
+            elif not connections:  # dropped after the first fill
+                lines = [heartbeat, fill_payload(2, "2", None)]
+            else:  # replays the backfilled fill
+                lines = [
+                    fill_payload(3, None, "2"),
+                    fill_payload(4, "4", None),
+                ]
+            connections.append(url.path)
+
+            self.send_response(200)
+            self.end_headers()
+            for line in lines:
+                self.wfile.write(json.dumps(line).encode() + b"\n")
+                self.wfile.flush()
+
+        def log_message(self, *_: Any) -> None:
+            pass
+
+    with ThreadingHTTPServer(("127.0.0.1", 0), Handler) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        monkeypatch.setattr(oanda_settings, "API_URL", f"http://{host}:{port}")
+        stream = TransactionStream(heartbeat_timeout=1, backoff=0.01)
+        transactions = list(islice(stream, 3))
+        server.shutdown()
+
+    assert [t.id for t in transactions] == ["2", "3", "4"]
+    assert backfills == ["2"]
+    assert stream.last_heartbeat is not None
+
+    opened, closed = transactions[:2]
+    assert isinstance(opened, models.OrderFill) and opened.entry
+    assert opened.entry.direction == TradeDirection.SHORT
+    assert isinstance(closed, models.OrderFill) and not closed.entry
+    (exit,) = closed.exits
+    assert (exit.trade_id, exit.exit_price, exit.fees) == ("2", 1.2, 0.5)
+
+
+def test_transaction_stream_backfill(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test fills missed while reconnecting being backfilled from the last
+    heartbeat, without a starting transaction."""
+
+    heartbeat = {
+        "type": "HEARTBEAT",
+        "time": "2024-01-02T10:00:00Z",
+        "lastTransactionID": "5",
+    }
+    backfills: list[str] = []
+    connections = 0
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            nonlocal connections
+            url = urlsplit(self.path)
+            if url.path.endswith("/sinceid"):
+                backfills.append(parse_qs(url.query)["id"][0])
+                lines = [
+                    {
+                        "transactions": [fill_payload(6, "6", None)],
+                        "lastTransactionID": "6",
+                    }
+                ]
+            elif connections == 0:  # dropped before the fill
+                connections += 1
+                lines = [heartbeat]
+            else:  # the fills after the missed one
+                connections += 1
+                id = connections + 5
+                lines = [fill_payload(id, str(id), None)]
+
+            self.send_response(200)
+            self.end_headers()
+            for line in lines:
+                self.wfile.write(json.dumps(line).encode() + b"\n")
+                self.wfile.flush()
+
+        def log_message(self, *_: Any) -> None:
+            pass
+
+    with ThreadingHTTPServer(("127.0.0.1", 0), Handler) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        monkeypatch.setattr(oanda_settings, "API_URL", f"http://{host}:{port}")
+        stream = TransactionStream(heartbeat_timeout=1, backoff=0.01)
+        transactions = list(islice(stream, 2))
+        server.shutdown()
+
+    assert [t.id for t in transactions] == ["6", "7"]
+    assert backfills == ["5"]
+
+
+def test_stream_trades(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test streamed exits covering the trade's reductions, and the stream
+    resuming after the last journaled transaction."""
+
+    path = tmp_path / "stream.json"
+    monkeypatch.setattr(StreamState, "path", classmethod(lambda _: path))
+    since: list[str | None] = []
+
+    def transactions(since_id: str | None) -> list[models.Transaction]:
+        since.append(since_id)
+        return [
+            models.OrderFill.model_validate(fill_payload(2, "2", None)),
+            models.OrderFill.model_validate(fill_payload(3, None, "2")),
+        ]
+
+    def handler(url: str) -> dict:
+        assert url == models.Trade.path("2")
+        details = trade_payload(
+            2,
+            "CLOSED",
+            averageClosePrice="1.15",  # reduced at 1.1 before closing
+            closeTime="2024-01-02T10:03:00.000000000Z",
+            financing="-1.5",
+            realizedPL="-5.0",
+        )
+        return {"trade": details}
+
+    monkeypatch.setattr("app.oanda.stream.TransactionStream", transactions)
+    serve(monkeypatch, handler)
+
+    records = stream_trades()
+    assert next(records).trade_id == "2"
+    assert not path.exists()  # the entry is not journaled yet
+    exit = next(records)
+    assert isinstance(exit, TradeExit)
+    assert (exit.exit_price, exit.fees, exit.realized_pl) == (1.15, 1.5, -5)
+    assert list(records) == []
+    assert StreamState.load().last_transaction_id == "3"
+
+    list(stream_trades())
+    assert since == [None, "3"]
@@ -0,0 +1,73 @@
+"""Startup time tests."""
+
+import importlib
+import subprocess
+import sys
+import time
+
+import typer
+from typer.testing import CliRunner
+
+from app.main import SUBCOMMANDS, app
+
+STARTUP_BUDGET = 0.15
+"""Maximum time to start the command-line client, in seconds, on top of
+the interpreter's startup. Commands are forwarded to the daemon by it."""
+LOCAL_BUDGET = 0.6
+"""Maximum time to import the CLI run without a daemon, in seconds, on top
+of the interpreter's startup. It is bounded by importing pydantic-settings
+and typer."""
+LAZY_MODULES = {
+    "app.journal",
+    "app.oanda",
+    "numpy",
+    "pycountry",
+    "pydantic_extra_types",
+    "requests",
+}
+"""Modules that must not be imported at startup."""
+
+runner = CliRunner()
+
+
+def test_startup_budget() -> None:
+    """Test the CLI starting within the time and module budgets."""
+
+    baseline = startup_time("pass")
+    assert startup_time("import app.client") - baseline < STARTUP_BUDGET
+    assert startup_time("import app.main") - baseline < LOCAL_BUDGET
+
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print(*sys.modules)"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.split()
+    assert not LAZY_MODULES.intersection(modules)
+
+
+def test_lazy_subcommands() -> None:
+    """Test sub-applications being imported when invoked."""
+
+    result = runner.invoke(app, ["-h"])
+    assert result.exit_code == 0
+    assert "journal" in result.stdout
+
+    result = runner.invoke(app, ["journal", "-h"])
+    assert result.exit_code == 0
+    assert "sync" in result.stdout
+
+    for name, (path, help) in SUBCOMMANDS.items():  # help shown unimported
+        module, attribute = path.split(":")
+        command = getattr(importlib.import_module(module), attribute)
+        assert typer.main.get_command(command).help == help, name
+
+
+def startup_time(code: str, runs: int = 3) -> float:
+    """The fastest wall time of an interpreter running code, in seconds."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)